@@ -0,0 +1,102 @@
+"""partition_refresh_token
+
+Revision ID: 4399b5d910c2
+Revises: 172085044088
+Create Date: 2026-10-18 10:12:41.503117
+
+"""
+
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4399b5d910c2"
+down_revision: Union[str, None] = "172085044088"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Секции на текущий месяц и столько же следующих, дальше их создает app.jobs.refresh_tokens
+PARTITIONS_AHEAD = 2
+
+COLUMNS = "id, issues_at, expires_at, is_active, is_staff, user_id"
+
+
+def _add_months(month_start: datetime, months: int) -> datetime:
+    month_index = month_start.month - 1 + months
+    return month_start.replace(year=month_start.year + month_index // 12, month=month_index % 12 + 1)
+
+
+def _create_refresh_token_table(primary_key: Sequence[str], **kw) -> None:
+    op.create_table(
+        "refresh_token",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("issues_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("is_staff", sa.Boolean(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["person.user_id"],
+        ),
+        sa.PrimaryKeyConstraint(*primary_key),
+        **kw,
+    )
+    op.create_index(op.f("ix_refresh_token_id"), "refresh_token", ["id"], unique=False)
+
+
+def upgrade() -> None:
+    op.drop_index(op.f("ix_refresh_token_id"), table_name="refresh_token")
+    op.rename_table("refresh_token", "refresh_token_old")
+    op.execute("alter index refresh_token_pkey rename to refresh_token_old_pkey")
+    op.execute(
+        "alter table refresh_token_old rename constraint refresh_token_user_id_fkey to refresh_token_old_fkey"
+    )
+
+    _create_refresh_token_table(["id", "expires_at"], postgresql_partition_by="RANGE (expires_at)")
+    op.create_index(
+        "ix_refresh_token_user_id_active",
+        "refresh_token",
+        ["user_id"],
+        unique=False,
+        postgresql_where=sa.text("is_active"),
+    )
+
+    now = datetime.now(timezone.utc)
+    current_month = datetime(now.year, now.month, 1, tzinfo=timezone.utc)
+    for i in range(PARTITIONS_AHEAD + 1):
+        month_start = _add_months(current_month, i)
+        op.execute(
+            f"create table refresh_token_p{month_start:%Y%m} partition of refresh_token "
+            f"for values from ('{month_start.isoformat()}') to ('{_add_months(month_start, 1).isoformat()}')"
+        )
+    op.execute("create table refresh_token_default partition of refresh_token default")
+
+    # Переносим только действующие токены, остальные больше не нужны
+    op.execute(
+        f"insert into refresh_token ({COLUMNS}) "
+        f"select {COLUMNS} from refresh_token_old where is_active and expires_at > now()"
+    )
+    op.drop_table("refresh_token_old")
+
+
+def downgrade() -> None:
+    op.rename_table("refresh_token", "refresh_token_partitioned")
+    op.drop_index(op.f("ix_refresh_token_id"), table_name="refresh_token_partitioned")
+    op.drop_index("ix_refresh_token_user_id_active", table_name="refresh_token_partitioned")
+    op.execute("alter index refresh_token_pkey rename to refresh_token_partitioned_pkey")
+    op.execute(
+        "alter table refresh_token_partitioned "
+        "rename constraint refresh_token_user_id_fkey to refresh_token_partitioned_fkey"
+    )
+
+    _create_refresh_token_table(["id"])
+    op.execute(
+        f"insert into refresh_token ({COLUMNS}) "
+        f"select {COLUMNS} from refresh_token_partitioned where is_active and expires_at > now()"
+    )
+    op.drop_table("refresh_token_partitioned")
@@ -1,33 +1,66 @@
+import hashlib
+from datetime import datetime
 from typing import Annotated
 
 import jwt
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Query
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.base import ExecutableOption
 from starlette import status
 
 from app import settings
 from app.database.utils import get_or_404
-from app.models import Channel, ChannelMember, User
+from app.models import Channel, ChannelMember
 from app.models.channel_member import Role
+from app.utils.cache import ExpiringLRUCache
+from app.utils.channel_access import get_channel_access
 from app.utils.security import AccessTokenPayload
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
+# Уже проверенные токены доступа: sha256(token) -> payload, запись живет до exp токена
+access_token_cache: ExpiringLRUCache[bytes, AccessTokenPayload] = ExpiringLRUCache(
+    settings.auth.access_token_cache_size
+)
+
+
+def _get_guest_permissions(is_public: bool) -> int:
+    return Role.GUEST if is_public else Role.ANONYMOUS
 
 
 async def get_current_channel_member(
-    db_session: AsyncSession, token: AccessTokenPayload, channel_id: int
+    db_session: AsyncSession, token: AccessTokenPayload, channel_id: int, *options: ExecutableOption
 ) -> ChannelMember:
-    member = await ChannelMember.get(db_session, user_id=token.user_id, channel_id=channel_id)
+    """Участник канала с правами текущего пользователя. Связи загружаются только переданные в options,
+    у гостя (не участника) загружен только канал.
+
+    Без options права берутся из кеша (app.utils.channel_access) и возвращается
+    не привязанный к сессии участник без связей, годный только для проверки прав.
+    """
+    if not options:
+        access = await get_channel_access(db_session, token.user_id, channel_id)
+        if access is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Channel not found.")
+        member, flags = access
+        return ChannelMember(
+            user_id=token.user_id,
+            channel_id=channel_id,
+            permissions=(
+                _get_guest_permissions(flags.is_public) if member.permissions is None else member.permissions
+            ),
+            is_owner=member.is_owner,
+        )
+    member = await ChannelMember.get(
+        db_session, options=options, user_id=token.user_id, channel_id=channel_id
+    )
     if member is not None:
         return member
     channel = await get_or_404(Channel, db_session, id=channel_id)
     return ChannelMember(
         user_id=token.user_id,
         channel_id=channel_id,
-        user=await User.get(db_session, id=token.user_id),
         channel=channel,
-        permissions=Role.GUEST if channel.is_public else Role.ANONYMOUS,
+        permissions=_get_guest_permissions(channel.is_public),
     )
 
 
@@ -37,12 +70,47 @@ def get_access_token(token: Annotated[str, Depends(oauth2_scheme)]) -> AccessTok
         detail="Invalid token",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    token_digest = hashlib.sha256(token.encode()).digest()
+    payload = access_token_cache.get(token_digest)
+    if payload is not None:
+        return payload
     try:
-        payload = jwt.decode(token, settings.auth.jwt_secret, algorithms=[settings.auth.jwt_algorithm])
-        return AccessTokenPayload.parse_obj(payload)
+        payload = AccessTokenPayload.model_validate(
+            jwt.decode(token, settings.auth.jwt_secret, algorithms=[settings.auth.jwt_algorithm])
+        )
     except jwt.InvalidTokenError:
         raise token_exception
+    exp = payload.exp.timestamp() if isinstance(payload.exp, datetime) else payload.exp
+    access_token_cache.set(token_digest, payload, expires_at=exp)
+    return payload
+
+
+def get_staff_access_token(
+    token: Annotated[AccessTokenPayload, Depends(get_access_token)],
+) -> AccessTokenPayload:
+    if not token.is_staff:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="This operation is available only for staff user.",
+        )
+    return token
+
+
+class Pagination:
+    def __init__(
+        self,
+        limit: Annotated[
+            int, Query(ge=1, le=settings.server.max_page_size, description="Количество записей на странице.")
+        ] = settings.server.default_page_size,
+        cursor: Annotated[
+            str | None, Query(description="Курсор страницы (next_cursor предыдущей страницы).")
+        ] = None,
+    ):
+        self.limit = limit
+        self.cursor = cursor
 
 
 LoginRequiredDep = Depends(get_access_token)
+StaffRequiredDep = Depends(get_staff_access_token)
 AccessTokenDep = Annotated[AccessTokenPayload, Depends(get_access_token)]
+PaginationDep = Annotated[Pagination, Depends()]
@@ -1,15 +1,23 @@
 from typing import Annotated, List, Literal, Set
 
 from fastapi import APIRouter, HTTPException, Path, Query, status
+from sqlalchemy.orm import joinedload
 
-from app.api.deps import AccessTokenDep, LoginRequiredDep, get_current_channel_member
-from app.database.deps import DBSessionDep
+from app.api.deps import AccessTokenDep, LoginRequiredDep, PaginationDep, get_current_channel_member
+from app.database.deps import DBSessionDep, ReadDBSessionDep
 from app.database.utils import get_or_404
-from app.models import Channel, ChannelMember
+from app.models import Channel, ChannelMember, MeetingFeed
 from app.models.channel_member import Permission, Role
 from app.models.utils import delete_owner
 from app.schemas.channel import CreateChannel, ReadChannel, RecoveryChannel, UpdateChannel
-from app.schemas.channel_member import ChannelMemberRole, CreateChannelMember, ReadChannelMember
+from app.schemas.channel_member import (
+    ChannelMemberRole,
+    ConfirmChannelMembers,
+    CreateChannelMember,
+    ReadChannelMember,
+)
+from app.schemas.page import Page
+from app.utils.channel_access import invalidate_channel, invalidate_channel_member
 
 router = APIRouter()
 
@@ -19,10 +27,12 @@ router = APIRouter()
     name="Получить список каналов.",
     description="Возвращает все каналы, которые не удалены (активны).",
     dependencies=[LoginRequiredDep],
-    response_model=List[ReadChannel],
+    response_model=Page[ReadChannel],
 )
-async def get_channel_list(db: DBSessionDep):
-    return await Channel.filter(db, Channel.is_active == True)  # noqa: E712
+async def get_channel_list(db: ReadDBSessionDep, pagination: PaginationDep):
+    return await Channel.paginate(
+        db, Channel.is_active == True, limit=pagination.limit, cursor=pagination.cursor  # noqa: E712
+    )
 
 
 @router.get(
@@ -31,12 +41,13 @@ async def get_channel_list(db: DBSessionDep):
     description="Возвращает канал текущего пользователя.",
     response_model=ReadChannel,
 )
-async def update_channel(db: DBSessionDep, token: AccessTokenDep):
+async def update_channel(db: ReadDBSessionDep, token: AccessTokenDep):
     curr_channel_member = await ChannelMember.get_first_by_filter(
         db,
         ChannelMember.user_id == token.user_id,
         ChannelMember.is_owner == True,  # noqa: E712
         ChannelMember.channel.has(is_personal=True),
+        options=[joinedload(ChannelMember.channel)],
     )
 
     if curr_channel_member is None:
@@ -54,7 +65,7 @@ async def update_channel(db: DBSessionDep, token: AccessTokenDep):
     response_model=ReadChannel,
     dependencies=[LoginRequiredDep],
 )
-async def get_channel(db: DBSessionDep, channel_id: Annotated[int, Path(ge=1)]):
+async def get_channel(db: ReadDBSessionDep, channel_id: Annotated[int, Path(ge=1)]):
     return await get_or_404(Channel, db, id=channel_id)
 
 
@@ -71,7 +82,9 @@ async def create_channel(db: DBSessionDep, token: AccessTokenDep, creating_data:
         channel_id=new_channel.id, user_id=token.user_id, permissions=Role.OWNER, is_owner=True
     )
     await channel_member.save(db)
-    return channel_member.channel
+    # members_cnt увеличивает триггер на вставку участника
+    await db.refresh(new_channel, ["members_cnt"])
+    return new_channel
 
 
 @router.put(
@@ -88,10 +101,11 @@ async def update_channel(  # noqa: F811
     channel_id: Annotated[int, Path(ge=1)],
     updating_data: UpdateChannel,
 ):
-    curr_member = await get_current_channel_member(db, token, channel_id)
+    curr_member = await get_current_channel_member(db, token, channel_id, joinedload(ChannelMember.channel))
     curr_member.has_permission_or_403(Permission.UPDATE_CHANNEL)
     channel = curr_member.channel
     await channel.update(db, updating_data)
+    invalidate_channel(db, channel.id)
     return channel
 
 
@@ -103,11 +117,12 @@ async def update_channel(  # noqa: F811
 async def deactivate_channel(  # noqa: F811
     db: DBSessionDep, token: AccessTokenDep, channel_id: Annotated[int, Path(ge=1)]
 ):
-    curr_member = await get_current_channel_member(db, token, channel_id)
+    curr_member = await get_current_channel_member(db, token, channel_id, joinedload(ChannelMember.channel))
     curr_member.has_permission_or_403(Permission.DELETE_CHANNEL)
     channel = curr_member.channel
     channel.is_active = False
     await channel.save(db)
+    invalidate_channel(db, channel.id)
     return channel
 
 
@@ -123,10 +138,11 @@ async def recovery_channel(
     channel_id: Annotated[int, Path(ge=1)],
     recovery_data: RecoveryChannel,
 ):
-    curr_member = await get_current_channel_member(db, token, channel_id)
-    if curr_member.user.is_staff or curr_member.is_owner:
+    curr_member = await get_current_channel_member(db, token, channel_id, joinedload(ChannelMember.channel))
+    if token.is_staff or curr_member.is_owner:
         channel = curr_member.channel
         await channel.update(db, recovery_data)
+        invalidate_channel(db, channel.id)
         return channel
     raise HTTPException(
         status_code=status.HTTP_403_FORBIDDEN,
@@ -156,6 +172,9 @@ async def subscribe(
             notify_about_meeting=member_data.notify_about_meeting,
         )
         await new_member.save(db)
+        invalidate_channel_member(db, channel.id, token.user_id)
+        if channel.is_public:
+            await MeetingFeed.add_channel_members(db, channel.id, [token.user_id])
         return new_member
     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Channel was deleted.")
 
@@ -167,11 +186,12 @@ async def subscribe(
     "Если у текущего пользователя нет права на просмотр участников, "
     "возвращает HTTP 403 (Отказано в доступе).",
     tags=["Участники сообщества (channel members)"],
-    response_model=List[ReadChannelMember],
+    response_model=Page[ReadChannelMember],
 )
 async def members(
-    db: DBSessionDep,
+    db: ReadDBSessionDep,
     token: AccessTokenDep,
+    pagination: PaginationDep,
     channel_id: Annotated[int, Path(ge=1)],
     roles: Annotated[
         Set[Literal["OWNER", "ADMIN", "EDITOR", "MEMBER", "BLOCKED", "CONFIRM_WAITER"]], Query()
@@ -180,20 +200,48 @@ async def members(
     curr_member = await get_current_channel_member(db, token, channel_id)
     curr_member.has_permission_or_403(Permission.SEE_SUBSCRIBERS)
     role_codes = list(map(lambda r: getattr(Role, r), roles))
-    if role_codes:
-        return await ChannelMember.filter(
-            db,
-            ChannelMember.channel_id == channel_id,
-            ChannelMember.permissions.in_(role_codes),
-            ChannelMember.date_of_join.isnot(None),
-        )
-    else:
-        return await ChannelMember.filter(
-            db,
-            ChannelMember.channel_id == channel_id,
-            ChannelMember.permissions.in_(role_codes),
-            ChannelMember.date_of_join.isnot(None),
+    return await ChannelMember.paginate(
+        db,
+        ChannelMember.channel_id == channel_id,
+        ChannelMember.permissions.in_(role_codes),
+        ChannelMember.date_of_join.isnot(None),
+        limit=pagination.limit,
+        cursor=pagination.cursor,
+        order_by=[ChannelMember.user_id],
+    )
+
+
+@router.patch(
+    "/{channel_id}/member/confirm/",
+    name="Подтвердить нескольких участников сообщества (канала)",
+    description="Дает права MEMBER указанным подписчикам канала, ожидающим подтверждения. "
+    "Возвращает подтвержденных участников, остальные пользователи пропускаются.",
+    tags=["Участники сообщества (channel members)"],
+    response_model=List[ReadChannelMember],
+)
+async def confirm_members(
+    db: DBSessionDep,
+    token: AccessTokenDep,
+    channel_id: Annotated[int, Path(ge=1)],
+    data: ConfirmChannelMembers,
+):
+    curr_member = await get_current_channel_member(db, token, channel_id)
+    curr_member.has_permission_or_403(Permission.GIVE_ACCESS)
+    confirmed_members = await ChannelMember.bulk_update(
+        db,
+        [
+            {"channel_id": channel_id, "user_id": user_id, "permissions": Role.MEMBER}
+            for user_id in data.user_ids
+        ],
+        ChannelMember.permissions == Role.CONFIRM_WAITER,
+    )
+    for member in confirmed_members:
+        invalidate_channel_member(db, channel_id, member.user_id)
+    if confirmed_members:
+        await MeetingFeed.add_channel_members(
+            db, channel_id, [member.user_id for member in confirmed_members]
         )
+    return confirmed_members
 
 
 @router.patch(
@@ -215,6 +263,8 @@ async def members(  # noqa: F811
     target_member = await get_or_404(ChannelMember, db, channel_id=channel_id, user_id=member_id)
     target_member.permissions = Role.MEMBER
     await target_member.save(db)
+    invalidate_channel_member(db, channel_id, member_id)
+    await MeetingFeed.add_channel_members(db, channel_id, [member_id])
     return target_member
 
 
@@ -232,7 +282,7 @@ async def edit_channel_member(
     member_id: Annotated[int, Path(description="This is target user id", ge=1)],
     data: ChannelMemberRole,
 ):
-    curr_member = await get_current_channel_member(db, token, channel_id)
+    curr_member = await get_current_channel_member(db, token, channel_id, joinedload(ChannelMember.channel))
     curr_member.has_permission_or_403(Permission.GIVE_ACCESS)
 
     target_member = await get_or_404(ChannelMember, db, channel_id=channel_id, user_id=member_id)
@@ -249,6 +299,11 @@ async def edit_channel_member(
     curr_member.has_permission_or_403(new_permissions)
     target_member.permissions = new_permissions
     await target_member.save(db)
+    invalidate_channel_member(db, channel_id, member_id)
+    if new_permissions & Permission.SEE_MEETINGS:
+        await MeetingFeed.add_channel_members(db, channel_id, [member_id])
+    else:
+        await MeetingFeed.remove_channel_members(db, channel_id, [member_id])
     return target_member
 
 
@@ -266,7 +321,7 @@ async def give_owner_role(
     channel_id: Annotated[int, Path(ge=1)],
     member_id: Annotated[int, Path(description="This is target user id", ge=1)],
 ):
-    curr_member = await get_current_channel_member(db, token, channel_id)
+    curr_member = await get_current_channel_member(db, token, channel_id, joinedload(ChannelMember.channel))
     target_member = await get_or_404(ChannelMember, db, channel_id=channel_id, user_id=member_id)
     if target_member == curr_member:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="You can not edit self.")
@@ -282,9 +337,9 @@ async def give_owner_role(
     curr_member.is_owner = False
     curr_member.permissions = Role.ADMIN
     db.add(curr_member)
-    db.add(target_member)
-    await db.commit()
-    await db.refresh(target_member)
+    await target_member.save(db)
+    invalidate_channel_member(db, channel_id, member_id)
+    invalidate_channel_member(db, channel_id, token.user_id)
     return target_member
 
 
@@ -297,7 +352,13 @@ async def give_owner_role(
     tags=["Участники сообщества (channel members)"],
 )
 async def unsubscribe(db: DBSessionDep, token: AccessTokenDep, channel_id: Annotated[int, Path(ge=1)]):
-    curr_member = await get_or_404(ChannelMember, db, user_id=token.user_id, channel_id=channel_id)
+    curr_member = await get_or_404(
+        ChannelMember,
+        db,
+        options=[joinedload(ChannelMember.channel).selectinload(Channel.members)],
+        user_id=token.user_id,
+        channel_id=channel_id,
+    )
     if curr_member is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -314,3 +375,5 @@ async def unsubscribe(db: DBSessionDep, token: AccessTokenDep, channel_id: Annot
             await delete_owner(db, curr_member)
     else:
         await curr_member.delete(db)
+        invalidate_channel_member(db, channel_id, token.user_id)
+        await MeetingFeed.remove_channel_members(db, channel_id, [token.user_id])
@@ -1,16 +1,30 @@
-from typing import Annotated, List
+from datetime import datetime
+from typing import Annotated, List, Set
 
-from fastapi import APIRouter, HTTPException, Path, Query, status
+from fastapi import APIRouter, HTTPException, Path, Query, Request, Response, status
+from sqlalchemy import select
 
-from app.api.deps import AccessTokenDep, get_current_channel_member
-from app.database.deps import DBSessionDep
+from app import settings
+from app.api.deps import AccessTokenDep, PaginationDep, get_current_channel_member
+from app.database.base import commit_or_flush
+from app.database.deps import DBSessionDep, ReadDBSessionDep, get_read_session_maker
 from app.database.utils import get_or_404
-from app.models import Feedback, Meeting, User
-from app.models.channel_member import ChannelMember, Permission, Role
+from app.models import Category, Feedback, Meeting, MeetingCategory, MeetingFeed, MeetingWaiter, User
+from app.models.channel_member import Permission
 from app.models.meeting_memeber import MeetingMember
+from app.schemas.category import Category as ReadCategory
 from app.schemas.feedback import FeedbackBase, ReadFeedback
-from app.schemas.meeting import CreateMeeting, ReadMeeting, UpdateMeeting
+from app.schemas.meeting import (
+    AddMeetingCategories,
+    CreateMeeting,
+    MeetingSearchPage,
+    ReadMeeting,
+    UpdateMeeting,
+    WaitlistPosition,
+)
+from app.schemas.page import Page
 from app.schemas.user import ReadUser
+from app.utils.ndjson import NDJSON_RESPONSES, stream_ndjson, wants_ndjson
 from app.utils.time import datetime_now
 
 router = APIRouter()
@@ -25,11 +39,12 @@ router = APIRouter()
     "в которых текущий пользователь является участником. Если текущий пользователь администратор, "
     "то возвращается все мероприятия которые будут в будущем."
     "Если нет мероприятий удовлетворяющих критериям поиска, возвращает пустой список.",
-    response_model=List[ReadMeeting],
+    response_model=Page[ReadMeeting],
 )
 async def get_meeting(
-    db: DBSessionDep,
+    db: ReadDBSessionDep,
     token: AccessTokenDep,
+    pagination: PaginationDep,
     completed: Annotated[
         bool, Query(description="Вернуть завершенные мероприятия на текущий момент.")
     ] = False,
@@ -41,19 +56,74 @@ async def get_meeting(
     if channel is not None:
         criteria.append(Meeting.channel_id == channel)
     if not token.is_staff:
-        curr_user_channel_ids = list(
-            map(
-                lambda cm: cm.channel.id,
-                await ChannelMember.filter(
-                    db,
-                    ChannelMember.user_id == token.user_id,
-                    ChannelMember.permissions != Role.CONFIRM_WAITER,
-                ),
+        criteria.append(Meeting.visible_to(token.user_id))
+    return await Meeting.paginate(db, *criteria, limit=pagination.limit, cursor=pagination.cursor)
+
+
+@router.get(
+    "/search/",
+    name="Поиск мероприятий",
+    description="Полнотекстовый поиск по названию и описанию мероприятия (русский и английский языки, "
+    'синтаксис как в поисковиках: "точная фраза", or, -исключить) с фильтрами. '
+    "Если задан текст поиска, мероприятия упорядочены по релевантности, иначе по дате начала. "
+    "Возвращаются только мероприятия, которые видит текущий пользователь. "
+    "На первой странице возвращается количество найденных мероприятий по категориям.",
+    response_model=MeetingSearchPage,
+)
+async def search_meetings(
+    db: ReadDBSessionDep,
+    token: AccessTokenDep,
+    pagination: PaginationDep,
+    q: Annotated[str | None, Query(min_length=1, max_length=256, description="Текст поиска.")] = None,
+    category_ids: Annotated[
+        Set[int] | None, Query(description="Мероприятия хотя бы одной из категорий.")
+    ] = None,
+    channel: Annotated[int | None, Query(description="Мероприятия канала.")] = None,
+    start_from: Annotated[
+        datetime | None, Query(description="Начало не раньше, по умолчанию текущий момент.")
+    ] = None,
+    start_to: Annotated[datetime | None, Query(description="Начало не позже.")] = None,
+    max_price: Annotated[int | None, Query(ge=0, description="Максимальная цена, 0 - бесплатные.")] = None,
+    age: Annotated[int | None, Query(ge=0, description="Мероприятия, доступные в этом возрасте.")] = None,
+    only_for_itmo_students: Annotated[bool | None, Query()] = None,
+    only_for_russians: Annotated[bool | None, Query()] = None,
+):
+    criteria = [Meeting.start_datetime >= (start_from or datetime_now())]
+    if start_to is not None:
+        criteria.append(Meeting.start_datetime <= start_to)
+    if channel is not None:
+        criteria.append(Meeting.channel_id == channel)
+    if max_price is not None:
+        # Для бесплатных именно price = 0, чтобы подошел частичный индекс
+        criteria.append(Meeting.price == 0 if max_price == 0 else Meeting.price <= max_price)
+    if age is not None:
+        criteria.extend((Meeting.minimum_age <= age, Meeting.maximum_age >= age))
+    if only_for_itmo_students is not None:
+        criteria.append(Meeting.only_for_itmo_students == only_for_itmo_students)
+    if only_for_russians is not None:
+        criteria.append(Meeting.only_for_russians == only_for_russians)
+    if not token.is_staff:
+        criteria.append(Meeting.visible_to(token.user_id))
+    order_by = [Meeting.start_datetime, Meeting.id]
+    if q is not None:
+        query = Meeting.get_search_query(q)
+        criteria.append(Meeting.matches(query))
+        # paginate сортирует по возрастанию, поэтому релевантность со знаком минус
+        order_by = [-Meeting.get_search_rank(query), Meeting.id]
+
+    facets = None
+    if pagination.cursor is None:
+        facets = [facet._asdict() for facet in await Meeting.count_by_category(db, *criteria)]
+    if category_ids:
+        criteria.append(
+            Meeting.id.in_(
+                select(MeetingCategory.meeting_id).filter(MeetingCategory.category_id.in_(category_ids))
             )
         )
-        criteria.append(Meeting.channel_id.in_(curr_user_channel_ids))
-    meeting_list = await Meeting.filter(db, *criteria)
-    return meeting_list
+    page = await Meeting.paginate(
+        db, *criteria, limit=pagination.limit, cursor=pagination.cursor, order_by=order_by
+    )
+    return {"items": page.items, "next_cursor": page.next_cursor, "facets": facets}
 
 
 @router.get(
@@ -63,7 +133,7 @@ async def get_meeting(
     response_model=ReadMeeting,
 )
 async def get_meeting(  # noqa: F811
-    db: DBSessionDep, token: AccessTokenDep, meeting_id: Annotated[int, Path(ge=1)]
+    db: ReadDBSessionDep, token: AccessTokenDep, meeting_id: Annotated[int, Path(ge=1)]
 ):
     meeting = await get_or_404(Meeting, db, id=meeting_id)
     curr_member = await get_current_channel_member(db, token, meeting.channel_id)
@@ -83,6 +153,7 @@ async def create_meeting(db: DBSessionDep, token: AccessTokenDep, creating_data:
     curr_member = await get_current_channel_member(db, token, creating_data.channel_id)
     curr_member.has_permission_or_403(Permission.CREATE_MEETING)
     meeting = await Meeting.create(db, creating_data)
+    await MeetingFeed.fan_out(db, meeting.id)
     return meeting
 
 
@@ -103,7 +174,17 @@ async def update_meeting(
     meeting = await get_or_404(Meeting, db, id=meeting_id)
     curr_member = await get_current_channel_member(db, token, meeting.channel_id)
     curr_member.has_permission_or_403(Permission.UPDATE_MEETING)
+    start_datetime = meeting.start_datetime
     await meeting.update(db, updating_data)
+    if meeting.is_fanned_out and meeting.start_datetime != start_datetime:
+        await MeetingFeed.reschedule(db, meeting.id, meeting.start_datetime)
+    # Календари участников должны получить новые данные мероприятия
+    await MeetingMember.touch_members(db, meeting.id)
+    # Если вместимость увеличили, свободные места занимают ожидающие
+    promoted = await MeetingMember.promote_waiters(db, meeting.id)
+    await commit_or_flush(db)
+    if promoted:
+        await db.refresh(meeting, ["members_cnt"])
     return meeting
 
 
@@ -116,26 +197,60 @@ async def delete_meeting(db: DBSessionDep, token: AccessTokenDep, meeting_id: An
     meeting = await get_or_404(Meeting, db, id=meeting_id)
     curr_member = await get_current_channel_member(db, token, meeting.channel_id)
     curr_member.has_permission_or_403(Permission.DELETE_MEETING)
+    await MeetingMember.touch_members(db, meeting.id)
     await meeting.delete(db)
 
 
+@router.post(
+    "/{meeting_id}/category/",
+    name="Добавить категории мероприятию",
+    description="Добавляет мероприятию указанные категории, уже добавленные категории пропускаются. "
+    "Возвращает все категории мероприятия. Если текущий пользователь не имеет прав на изменение "
+    "мероприятия, возвращается HTTP 403 (Отказано в доступе).",
+    response_model=List[ReadCategory],
+)
+async def add_meeting_categories(
+    db: DBSessionDep,
+    token: AccessTokenDep,
+    meeting_id: Annotated[int, Path(ge=1)],
+    data: AddMeetingCategories,
+):
+    meeting = await get_or_404(Meeting, db, id=meeting_id)
+    curr_member = await get_current_channel_member(db, token, meeting.channel_id)
+    curr_member.has_permission_or_403(Permission.UPDATE_MEETING)
+    await MeetingCategory.bulk_create(
+        db,
+        [{"meeting_id": meeting_id, "category_id": category_id} for category_id in data.category_ids],
+        ignore_conflicts=True,
+    )
+    return await Category.filter(db, Category.meetings.any(Meeting.id == meeting_id))
+
+
 @router.post(
     "/{meeting_id}/member/",
     name="Присоединится к мероприятию",
     description="Присоединяет к мероприятию авторизованного (текущего) пользователя. "
     "Если текущий пользователь уже добавлен, возвращает HTTP 409 (Конфликт)."
-    "Если текущий пользователь не имеет прав доступа на вступление, либо количество участников максимально "
-    "(т. е. нет мест), возвращает HTTP 403 (Отказано в доступе).",
+    "Если текущий пользователь не имеет прав доступа на вступление, "
+    "возвращает HTTP 403 (Отказано в доступе). Если свободных мест нет, пользователь добавляется "
+    "в лист ожидания и возвращается HTTP 202 (Принято) с позицией в очереди. "
+    "Когда место освободится, первый ожидающий станет участником автоматически.",
     tags=["Участник мероприятия (meeting member)"],
+    response_model=WaitlistPosition | None,
+    responses={status.HTTP_202_ACCEPTED: {"model": WaitlistPosition}},
 )
-async def join_to_meeting(db: DBSessionDep, token: AccessTokenDep, meeting_id: Annotated[int, Path(ge=1)]):
+async def join_to_meeting(
+    db: DBSessionDep, token: AccessTokenDep, response: Response, meeting_id: Annotated[int, Path(ge=1)]
+):
     meeting = await get_or_404(Meeting, db, id=meeting_id)
     curr_member = await get_current_channel_member(db, token, meeting.channel_id)
     curr_member.has_permission_or_403(Permission.JOIN_TO_MEETING)
-    if len(await meeting.awaitable_attrs.members) >= meeting.capacity:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Capacity is full")
-    meeting.members.append(curr_member.user)
-    await meeting.save(db)
+    if await MeetingMember.join(db, meeting.id, token.user_id):
+        return
+    position = await MeetingMember.wait_for_seat(db, meeting.id, token.user_id)
+    if position is not None:
+        response.status_code = status.HTTP_202_ACCEPTED
+        return WaitlistPosition(position=position)
 
 
 @router.get(
@@ -145,17 +260,62 @@ async def join_to_meeting(db: DBSessionDep, token: AccessTokenDep, meeting_id: A
     "данный метод похож на метод возвращающий список пользователей, "
     "однако в данном методе значения конфиденциальных полей не скрываются. "
     "Если текущий пользователь не имеет прав на просмотр участников, "
-    "возвращается HTTP 403 (Отказано в доступе).",
+    "возвращается HTTP 403 (Отказано в доступе). "
+    "Если в заголовке Accept указан application/x-ndjson, то возвращает всех участников "
+    "без постраничной разбивки, по одному JSON объекту на строку.",
     tags=["Участник мероприятия (meeting member)"],
-    response_model=List[ReadUser],
+    response_model=Page[ReadUser],
+    responses=NDJSON_RESPONSES,
 )
 async def get_meeting_members(
-    db: DBSessionDep, token: AccessTokenDep, meeting_id: Annotated[int, Path(ge=1)]
+    request: Request,
+    db: ReadDBSessionDep,
+    token: AccessTokenDep,
+    pagination: PaginationDep,
+    meeting_id: Annotated[int, Path(ge=1)],
 ):
     meeting = await get_or_404(Meeting, db, id=meeting_id)
     curr_member = await get_current_channel_member(db, token, meeting.channel_id)
     curr_member.has_permission_or_403(Permission.SEE_MEETINGS_MEMBERS)
-    return await meeting.awaitable_attrs.members
+    is_member = User.meetings.any(Meeting.id == meeting_id)
+    if wants_ndjson(request):
+        return stream_ndjson(
+            get_read_session_maker(request),
+            lambda db_session: User.stream(db_session, is_member),
+            lambda u: ReadUser.model_validate(u).model_dump_json(),
+        )
+    return await User.paginate(db, is_member, limit=pagination.limit, cursor=pagination.cursor)
+
+
+@router.get(
+    "/{meeting_id}/waitlist/me/",
+    name="Позиция в листе ожидания мероприятия",
+    description="Возвращает позицию текущего пользователя в листе ожидания мероприятия. "
+    "Если пользователь не ожидает места, возвращает HTTP 404 (Объект не найден).",
+    tags=["Участник мероприятия (meeting member)"],
+    response_model=WaitlistPosition,
+)
+async def get_waitlist_position(
+    db: ReadDBSessionDep, token: AccessTokenDep, meeting_id: Annotated[int, Path(ge=1)]
+):
+    position = await MeetingWaiter.get_position(db, meeting_id, token.user_id)
+    if position is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="You are not in the waitlist")
+    return WaitlistPosition(position=position)
+
+
+@router.delete(
+    "/{meeting_id}/waitlist/me/",
+    name="Покинуть лист ожидания мероприятия",
+    description="Удаляет текущего пользователя из листа ожидания мероприятия. Метод ничего не возвращает.",
+    tags=["Участник мероприятия (meeting member)"],
+)
+async def leave_waitlist(db: DBSessionDep, token: AccessTokenDep, meeting_id: Annotated[int, Path(ge=1)]):
+    deleted = await MeetingWaiter.bulk_delete(
+        db, MeetingWaiter.meeting_id == meeting_id, MeetingWaiter.user_id == token.user_id
+    )
+    if not deleted:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="You are not in the waitlist")
 
 
 @router.delete(
@@ -166,12 +326,30 @@ async def get_meeting_members(
     tags=["Участник мероприятия (meeting member)"],
 )
 async def leave_meeting(db: DBSessionDep, token: AccessTokenDep, meeting_id: Annotated[int, Path(ge=1)]):
-    meeting = await get_or_404(Meeting, db, id=meeting_id)
-    user = await User.get(db, id=token.user_id)
-    if user not in await meeting.awaitable_attrs.members:
+    if not await MeetingMember.leave(db, meeting_id, [token.user_id]):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="You are not meeting member")
-    meeting.members.remove(user)
-    await meeting.save(db)
+
+
+@router.delete(
+    "/{meeting_id}/member/",
+    name="Выгнать нескольких участников мероприятия",
+    description="Исключает указанных пользователей из списка участников целевого мероприятия. "
+    "Если текущий пользователь пользователь не имеет права на обновление мероприятия, "
+    "то возвращается HTTP 403 (Отказано в доступе). Метод не возвращает данных.",
+    tags=["Участник мероприятия (meeting member)"],
+)
+async def kick_meeting_members(
+    db: DBSessionDep,
+    token: AccessTokenDep,
+    meeting_id: Annotated[int, Path(ge=1)],
+    user_ids: Annotated[
+        Set[int], Query(min_length=1, max_length=settings.server.max_batch_size, description="User.id")
+    ],
+):
+    meeting = await get_or_404(Meeting, db, id=meeting_id)
+    curr_member = await get_current_channel_member(db, token, meeting.channel_id)
+    curr_member.has_permission_or_403(Permission.UPDATE_MEETING)
+    await MeetingMember.leave(db, meeting_id, user_ids)
 
 
 @router.delete(
@@ -189,12 +367,10 @@ async def kick_channel_member(
     member_id: Annotated[int, Path(ge=1, description="This is User.id")],
 ):
     meeting = await get_or_404(Meeting, db, id=meeting_id)
-    curr_member = await get_current_channel_member(db, token.user_id, meeting.channel_id)
+    curr_member = await get_current_channel_member(db, token, meeting.channel_id)
     curr_member.has_permission_or_403(Permission.UPDATE_MEETING)
-    kicked_user = await get_or_404(User, db, id=member_id)
-    await meeting.awaitable_attrs.members
-    meeting.members.remove(kicked_user)
-    await meeting.save(db)
+    if not await MeetingMember.leave(db, meeting_id, [member_id]):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User is not meeting member")
 
 
 @router.get(
@@ -205,7 +381,7 @@ async def kick_channel_member(
     tags=["Отзывы мероприятий (meeting feedbacks)"],
     response_model=ReadFeedback,
 )
-async def get_feedback(db: DBSessionDep, token: AccessTokenDep, meeting_id: Annotated[int, Path(ge=1)]):
+async def get_feedback(db: ReadDBSessionDep, token: AccessTokenDep, meeting_id: Annotated[int, Path(ge=1)]):
     return await get_or_404(Feedback, db, meeting_id=meeting_id, user_id=token.user_id)
 
 
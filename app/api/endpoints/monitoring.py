@@ -0,0 +1,71 @@
+from fastapi import APIRouter, HTTPException, status
+
+from app.api.deps import StaffRequiredDep, access_token_cache
+from app.database import async_engine
+from app.database.core import async_replica_engine
+from app.database.slow_queries import slow_query_log
+from app.utils.channel_access import channel_flags_cache, member_access_cache
+from app.utils.password import password_hasher
+
+router = APIRouter(dependencies=[StaffRequiredDep])
+
+
+@router.get(
+    "/password-hasher/",
+    name="Метрики хеширования паролей",
+    description="Возвращает глубину очереди и задержки пула процессов, хеширующего пароли. "
+    "Доступно только администратору.",
+)
+async def get_password_hasher_metrics():
+    return password_hasher.get_metrics()
+
+
+@router.get(
+    "/access-token-cache/",
+    name="Метрики кеша токенов доступа",
+    description="Возвращает размер кеша проверенных токенов доступа и количество попаданий и промахов.",
+)
+async def get_access_token_cache_metrics():
+    return access_token_cache.get_stats()
+
+
+@router.get(
+    "/channel-access-cache/",
+    name="Метрики кеша прав в каналах",
+    description="Возвращает размер и количество попаданий и промахов кешей прав участников "
+    "и признаков каналов в текущем процессе (воркере).",
+)
+async def get_channel_access_cache_metrics():
+    return {"members": member_access_cache.get_stats(), "channels": channel_flags_cache.get_stats()}
+
+
+@router.get(
+    "/db-pool/",
+    name="Метрики пула соединений с БД",
+    description="Возвращает количество занятых и свободных соединений, время ожидания соединения "
+    "и количество таймаутов ожидания в текущем процессе (воркере).",
+)
+async def get_db_pool_metrics():
+    return async_engine.pool.get_metrics()
+
+
+@router.get(
+    "/db-replica-pool/",
+    name="Метрики пула соединений с репликой БД",
+    description="То же, что и метрики пула соединений с БД, но для реплики. "
+    "Если реплика не настроена, возвращает HTTP 404 (Объект не найден).",
+)
+async def get_db_replica_pool_metrics():
+    if async_replica_engine is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Replica is not configured.")
+    return async_replica_engine.pool.get_metrics()
+
+
+@router.get(
+    "/slow-queries/",
+    name="Метрики журнала медленных запросов",
+    description="Возвращает порог медленного запроса, количество записанных в журнал запросов, "
+    "запросов с планом EXPLAIN и запросов, отброшенных из-за переполнения очереди.",
+)
+async def get_slow_query_metrics():
+    return slow_query_log.get_metrics()
@@ -1,7 +1,8 @@
+import math
 from typing import Annotated
 
 import jwt
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from starlette import status
 
@@ -9,17 +10,38 @@ from app.api.deps import AccessTokenDep
 from app.database.deps import DBSessionDep
 from app.models import RefreshToken, User
 from app.schemas.token import RefreshTokenRequest, TokenResponse
+from app.schemas.user import parse_login
+from app.utils.rate_limit import login_throttle
 from app.utils.security import create_access_token, create_refresh_token, decode_refresh_token
 
 router = APIRouter()
 
 
-@router.post("/token", name="Создать токен")
+@router.post(
+    "/token",
+    name="Создать токен",
+    description="Количество попыток входа ограничено для каждого логина и ip адреса. "
+    "При превышении лимита возвращается HTTP 429 (Слишком много запросов) с заголовком Retry-After.",
+)
 async def create_token(
-    db_session: DBSessionDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
+    request: Request,
+    db_session: DBSessionDep,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
 ) -> TokenResponse:
-    user = await User.get_by_login(db_session, form_data.username)
-    if user is None or not user.verify_password(form_data.password) or not user.is_active:
+    logins = parse_login(form_data.username)
+    # Разные записи одного телефона или email расходуют общие попытки входа
+    throttle_login = logins.get("telephone") or logins.get("email") or form_data.username
+    retry_after = await login_throttle.get_retry_after(
+        throttle_login, request.client.host if request.client else None
+    )
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    user = await User.get_by_login(db_session, logins)
+    if user is None or not await user.verify_password(form_data.password) or not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Wrong login",
@@ -44,17 +66,11 @@ async def refresh_access_token(db_session: DBSessionDep, data: RefreshTokenReque
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Token was expired")
     except jwt.PyJWTError:
-        raise HTTPException(status_code=status.UNAUTHORIZED, detail="Invalid token")
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-    refresh_token = await RefreshToken.get(db_session, id=refresh_payload.jti)
-    if not refresh_token.is_active:
+    new_refresh_token = await RefreshToken.rotate(db_session, refresh_payload.jti)
+    if new_refresh_token is None:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Token is deactivated")
-
-    refresh_token.is_active = False
-    await refresh_token.save(db_session)
-
-    new_refresh_token = RefreshToken(is_staff=refresh_token.is_staff, user_id=refresh_token.user_id)
-    await new_refresh_token.save(db_session)
     return TokenResponse(
         access_token=create_access_token(new_refresh_token),
         refresh_token=create_refresh_token(new_refresh_token),
@@ -1,17 +1,23 @@
 from typing import Annotated, List
 
-from fastapi import APIRouter, HTTPException, Path, Query, status
+from fastapi import APIRouter, HTTPException, Path, Query, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 
 import app.schemas.user as schemas
-from app.api.deps import AccessTokenDep
-from app.database.deps import DBSessionDep
+from app.api.deps import AccessTokenDep, PaginationDep
+from app.database.deps import DBSessionDep, ReadDBSessionDep, get_read_session_maker
 from app.database.utils import get_or_404
-from app.models import ChannelMember, User, utils
+from app.models import ChannelMember, Meeting, MeetingFeed, MeetingRecommendation, User, utils
+from app.models.secondary_tables import meeting_member
 from app.schemas.complex_schemas import ChannelMemberWithChannel
 from app.schemas.meeting import ReadMeeting
-from app.utils.e_mail import send_confirm_email
+from app.schemas.page import Page
+from app.utils.e_mail import enqueue_confirm_email
 from app.utils.hash import verify_simple_hash
-from app.utils.urls import get_email_confirm_url
+from app.utils.ical import ICS_RESPONSES, is_not_modified, stream_ics
+from app.utils.ndjson import NDJSON_RESPONSES, stream_ndjson, wants_ndjson
+from app.utils.urls import get_calendar_url, get_email_confirm_url
 
 router = APIRouter()
 
@@ -24,8 +30,10 @@ router = APIRouter()
     response_model=schemas.ReadUser,
 )
 async def create_user(db: DBSessionDep, creating_data: schemas.CreateUser):
-    new_user = await User.create(db, creating_data)
-    send_confirm_email(new_user.email, get_email_confirm_url(new_user.id, new_user.email))
+    new_user = User(**creating_data.model_dump(exclude={"password"}))
+    await new_user.set_password(creating_data.password)
+    await new_user.save(db)
+    enqueue_confirm_email(db, new_user.email, get_email_confirm_url(new_user.id, new_user.email))
     return new_user
 
 
@@ -51,7 +59,7 @@ async def resend_confirm_email(db: DBSessionDep, token: AccessTokenDep):
     curr_user = await get_or_404(User, db, id=token.user_id)
     if curr_user.is_email_verified:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
-    send_confirm_email(curr_user.email, get_email_confirm_url(curr_user.id, curr_user.email))
+    enqueue_confirm_email(db, curr_user.email, get_email_confirm_url(curr_user.id, curr_user.email))
     return "ok"
 
 
@@ -61,7 +69,7 @@ async def resend_confirm_email(db: DBSessionDep, token: AccessTokenDep):
     description="Возвращает текущего (авторизованного) пользователя.",
     response_model=schemas.ReadUser,
 )
-async def get_curr_user(db: DBSessionDep, token: AccessTokenDep):
+async def get_curr_user(db: ReadDBSessionDep, token: AccessTokenDep):
     return await User.get(db, id=token.user_id)
 
 
@@ -77,7 +85,8 @@ async def change_user_password(
     new_password: schemas.ChangeUserPassword,
 ):
     curr_user = await User.get(db, id=token.user_id)
-    await curr_user.update(db, new_password)
+    await curr_user.set_password(new_password.password)
+    await curr_user.save(db)
     return curr_user
 
 
@@ -103,24 +112,50 @@ async def deactivate_curr_user(db: DBSessionDep, token: AccessTokenDep):
     name="Получить мои каналы",
     description="Возвращает все экземпляры сущности участник канала с вложенным в нее сообществом (каналом). "
     "В выборку попадают все сообщества (каналы) где текущий пользователь участник или подписчик.",
-    response_model=List[ChannelMemberWithChannel],
+    response_model=Page[ChannelMemberWithChannel],
 )
-async def get_my_channels(db: DBSessionDep, token: AccessTokenDep):
-    return await ChannelMember.filter(db, ChannelMember.user_id == token.user_id)
+async def get_my_channels(db: ReadDBSessionDep, token: AccessTokenDep, pagination: PaginationDep):
+    return await ChannelMember.paginate(
+        db,
+        ChannelMember.user_id == token.user_id,
+        limit=pagination.limit,
+        cursor=pagination.cursor,
+        order_by=[ChannelMember.channel_id],
+        options=[joinedload(ChannelMember.channel)],
+    )
 
 
 @router.get(
     "/list/",
     name="Получить список пользователей",
     description="Возвращает список пользователей. Если текущий пользователь администратор, "
-    "то все конфиденциальные поля НЕ скрыты, иначе значение этих полей установлены в null.",
-    response_model=List[schemas.ReadOpenUserInfo],
+    "то все конфиденциальные поля НЕ скрыты, иначе значение этих полей установлены в null. "
+    "Если в заголовке Accept указан application/x-ndjson, то возвращает всех пользователей "
+    "без постраничной разбивки, по одному JSON объекту на строку.",
+    response_model=Page[schemas.ReadOpenUserInfo],
+    responses=NDJSON_RESPONSES,
 )
-async def get_user_list(db: DBSessionDep, token: AccessTokenDep):
-    user_list = await User.get_all(db)
+async def get_user_list(
+    request: Request, db: ReadDBSessionDep, token: AccessTokenDep, pagination: PaginationDep
+):
+    if wants_ndjson(request):
+        if token.is_staff:
+            return stream_ndjson(
+                get_read_session_maker(request),
+                User.stream,
+                lambda u: schemas.ReadOpenUserInfo.model_validate(u).model_dump_json(),
+            )
+        return stream_ndjson(
+            get_read_session_maker(request),
+            User.stream,
+            lambda u: schemas.ReadOpenUserInfo.model_validate(
+                schemas.get_open_user_info(u)
+            ).model_dump_json(),
+        )
+    page = await User.paginate(db, limit=pagination.limit, cursor=pagination.cursor)
     if token.is_staff:
-        return user_list
-    return map(schemas.get_open_user_info, user_list)
+        return page
+    return page._replace(items=list(map(schemas.get_open_user_info, page.items)))
 
 
 @router.get(
@@ -132,7 +167,7 @@ async def get_user_list(db: DBSessionDep, token: AccessTokenDep):
     response_model=schemas.ReadOpenUserInfo,
 )
 async def get_user(
-    db: DBSessionDep,
+    db: ReadDBSessionDep,
     token: AccessTokenDep,
     user_id: Annotated[int, Path(ge=1, examples=[1])],
 ):
@@ -159,11 +194,10 @@ async def update_user(
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="You do not have access to update user."
         )
-    old_email = user.email
-    await user.update(db, updating_data)
-    if old_email != user.email:
+    if user.email != updating_data.email:
         user.is_email_verified = False
-        send_confirm_email(user.email, get_email_confirm_url(user.id, user.email))
+        enqueue_confirm_email(db, updating_data.email, get_email_confirm_url(user.id, updating_data.email))
+    await user.update(db, updating_data)
     return user
 
 
@@ -199,8 +233,81 @@ async def deactivate_user(
     "/me/meetings/",
     name="Получит связанные со мной мероприятия",
     description="Возвращает все мероприятия в которых текущий пользователь является участником.",
+    response_model=Page[ReadMeeting],
+)
+async def get_my_meeting(db: ReadDBSessionDep, token: AccessTokenDep, pagination: PaginationDep):
+    return await Meeting.paginate(
+        db, Meeting.members.any(User.id == token.user_id), limit=pagination.limit, cursor=pagination.cursor
+    )
+
+
+@router.get(
+    "/me/feed/",
+    name="Получить ленту мероприятий",
+    description="Возвращает предстоящие мероприятия сообществ (каналов), в которых текущий пользователь "
+    "может просматривать мероприятия, в порядке начала.",
+    response_model=Page[ReadMeeting],
+)
+async def get_my_feed(db: ReadDBSessionDep, token: AccessTokenDep, pagination: PaginationDep):
+    return await MeetingFeed.get_page(db, token.user_id, limit=pagination.limit, cursor=pagination.cursor)
+
+
+@router.get(
+    "/me/recommendations/",
+    name="Получить рекомендованные мероприятия",
+    description="Возвращает предстоящие мероприятия, подобранные по любимым категориям "
+    "текущего пользователя, его сообществам (каналам) и рейтингу мероприятий. "
+    "Рекомендации пересчитываются периодически, "
+    "поэтому недавно созданные мероприятия могут в них отсутствовать.",
     response_model=List[ReadMeeting],
 )
-async def get_my_meeting(db: DBSessionDep, token: AccessTokenDep):
-    curr_user = await User.get(db, id=token.user_id)
-    return await curr_user.awaitable_attrs.meetings
+async def get_my_recommendations(db: ReadDBSessionDep, token: AccessTokenDep):
+    return await MeetingRecommendation.get_meetings(db, token.user_id)
+
+
+@router.get(
+    "/me/calendar/",
+    name="Получить ссылку на календарь моих мероприятий",
+    description="Возвращает ссылку на календарь iCalendar с мероприятиями текущего пользователя "
+    "для подписки в приложении календаря. Ссылка не требует авторизации, её нужно хранить в секрете.",
+    response_model=schemas.CalendarUrl,
+)
+async def get_my_calendar_url(token: AccessTokenDep):
+    return schemas.CalendarUrl(url=get_calendar_url(token.user_id))
+
+
+@router.get(
+    "/{user_id}/meetings.ics",
+    name="Календарь мероприятий пользователя",
+    description="Возвращает мероприятия, в которых пользователь является участником, в формате iCalendar. "
+    "Доступ по ссылке из /user/me/calendar/. Ответ содержит ETag, если календарь не изменился "
+    "с указанной в If-None-Match версии, возвращается HTTP 304 (Не изменено) без тела.",
+    response_class=Response,
+    responses=ICS_RESPONSES,
+)
+async def get_meetings_calendar(
+    request: Request,
+    db: ReadDBSessionDep,
+    user_id: Annotated[int, Path(ge=1)],
+    token: Annotated[str, Query(alias="t")],
+):
+    if not verify_simple_hash("calendar" + str(user_id), token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+    meetings_version = await db.scalar(
+        select(User.meetings_version).where(User.id == user_id, User.is_active == True)  # noqa: E712
+    )
+    if meetings_version is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    etag = f'"{meetings_version}"'
+    # Клиенты календарей опрашивают ссылку часто, пока версия не изменилась, мероприятия не читаются
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if is_not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    user_meeting_ids = select(meeting_member.c.meeting_id).where(meeting_member.c.user_id == user_id)
+    return stream_ics(
+        get_read_session_maker(request),
+        lambda db_session: Meeting.stream(
+            db_session, Meeting.id.in_(user_meeting_ids), order_by=[Meeting.start_datetime, Meeting.id]
+        ),
+        headers,
+    )
@@ -1,23 +1,108 @@
-from typing import Any, Optional, Self, Sequence, Tuple, Type, Union
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, AsyncIterator, NamedTuple, Optional, Self, Sequence, Tuple, Type, Union
 
 from fastapi import HTTPException, status
 from pydantic import BaseModel
-from sqlalchemy import ColumnExpressionArgument, select
+from sqlalchemy import (
+    ColumnElement,
+    ColumnExpressionArgument,
+    Date,
+    DateTime,
+    column,
+    delete,
+    inspect,
+    literal,
+    select,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncAttrs, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.sql.base import ExecutableOption
+
+STREAM_BATCH_SIZE = 1000
+# Ключ в AsyncSession.info, которым get_db помечает сессию, работающую как единица работы
+UNIT_OF_WORK = "unit_of_work"
+
+
+class Page(NamedTuple):
+    items: Sequence[Any]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Кодирует значения ключа сортировки последней записи страницы в непрозрачный курсор."""
+    data = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+def decode_cursor(cursor: str, keys: Sequence[ColumnElement]) -> Tuple[Any, ...]:
+    invalid_cursor = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise invalid_cursor
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise invalid_cursor
+    try:
+        return tuple(
+            (
+                datetime.fromisoformat(value)
+                if isinstance(key.type, DateTime)
+                else date.fromisoformat(value) if isinstance(key.type, Date) else value
+            )
+            for key, value in zip(keys, values)
+        )
+    except (TypeError, ValueError):
+        raise invalid_cursor
+
+
+def is_unit_of_work(async_session: AsyncSession) -> bool:
+    return async_session.info.get(UNIT_OF_WORK, False)
+
+
+async def commit_or_flush(async_session: AsyncSession) -> None:
+    """Фиксирует изменения. В режиме единицы работы только отправляет их в БД:
+    транзакцию один раз зафиксирует (или откатит) get_db в конце запроса.
+    """
+    if is_unit_of_work(async_session):
+        await async_session.flush()
+    else:
+        await async_session.commit()
 
 
 class Base(AsyncAttrs, DeclarativeBase):
     @classmethod
-    async def get(cls, async_session: AsyncSession, **pk: Union[Any, Tuple[Any, ...]]) -> Optional[Self]:
-        return await async_session.get(cls, pk)
+    async def get(
+        cls,
+        async_session: AsyncSession,
+        *,
+        options: Sequence[ExecutableOption] = (),
+        **pk: Union[Any, Tuple[Any, ...]],
+    ) -> Optional[Self]:
+        if not options:
+            return await async_session.get(cls, pk)
+        # Загруженный ранее объект session.get вернет без запроса и без загрузки связей из options
+        stmt = select(cls).filter_by(**pk).options(*options)
+        result = await async_session.execute(stmt)
+        return result.scalars().first()
 
     @classmethod
     async def get_all(
-        cls, async_session: AsyncSession, *, offset: int = 0, limit: int | None = None
+        cls,
+        async_session: AsyncSession,
+        *,
+        offset: int = 0,
+        limit: int | None = None,
+        options: Sequence[ExecutableOption] = (),
     ) -> Sequence[Self]:
-        stmt = select(cls).offset(offset)
+        stmt = select(cls).options(*options).offset(offset)
         if limit is not None:
             stmt = stmt.limit(limit)
         result = await async_session.execute(stmt)
@@ -25,20 +110,73 @@ class Base(AsyncAttrs, DeclarativeBase):
 
     @classmethod
     async def get_first_by_filter(
-        cls, async_session: AsyncSession, *criterion: ColumnExpressionArgument[bool]
+        cls,
+        async_session: AsyncSession,
+        *criterion: ColumnExpressionArgument[bool],
+        options: Sequence[ExecutableOption] = (),
     ) -> Optional[Self]:
-        stmt = select(cls).filter(*criterion).limit(1)
+        stmt = select(cls).filter(*criterion).options(*options).limit(1)
         result = await async_session.execute(stmt)
         return result.scalars().first()
 
     @classmethod
     async def filter(
-        cls, async_session: AsyncSession, *criterion: ColumnExpressionArgument[bool]
+        cls,
+        async_session: AsyncSession,
+        *criterion: ColumnExpressionArgument[bool],
+        options: Sequence[ExecutableOption] = (),
     ) -> Sequence[Self]:
-        stmt = select(cls).filter(*criterion)
+        stmt = select(cls).filter(*criterion).options(*options)
         result = await async_session.execute(stmt)
         return result.scalars().all()
 
+    @classmethod
+    async def paginate(
+        cls,
+        async_session: AsyncSession,
+        *criterion: ColumnExpressionArgument[bool],
+        limit: int,
+        cursor: str | None = None,
+        order_by: Sequence[ColumnElement] | None = None,
+        options: Sequence[ExecutableOption] = (),
+    ) -> Page:
+        """Возвращает страницу записей, отсортированных по order_by (по умолчанию - по первичному ключу).
+
+        Следующая страница выбирается по значению ключа сортировки последней записи (keyset),
+        поэтому ключ должен быть уникальным и покрываться индексом.
+        """
+        keys = list(order_by) if order_by is not None else list(cls.__mapper__.primary_key)
+        stmt = select(cls, *keys).filter(*criterion).options(*options).order_by(*keys).limit(limit + 1)
+        if cursor is not None:
+            values = decode_cursor(cursor, keys)
+            stmt = stmt.filter(
+                tuple_(*keys) > tuple_(*(literal(value, key.type) for key, value in zip(keys, values)))
+            )
+        rows = (await async_session.execute(stmt)).all()
+        next_cursor = encode_cursor(rows[limit - 1][1:]) if len(rows) > limit else None
+        return Page([row[0] for row in rows[:limit]], next_cursor)
+
+    @classmethod
+    async def stream(
+        cls,
+        async_session: AsyncSession,
+        *criterion: ColumnExpressionArgument[bool],
+        order_by: Sequence[ColumnElement] | None = None,
+        options: Sequence[ExecutableOption] = (),
+    ) -> AsyncIterator[Self]:
+        """Построчно отдает записи через серверный курсор, не загружая всю выборку в память."""
+        keys = list(order_by) if order_by is not None else list(cls.__mapper__.primary_key)
+        stmt = (
+            select(cls)
+            .filter(*criterion)
+            .options(*options)
+            .order_by(*keys)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        result = await async_session.stream_scalars(stmt)
+        async for obj in result:
+            yield obj
+
     @classmethod
     async def create(
         cls,
@@ -60,6 +198,78 @@ class Base(AsyncAttrs, DeclarativeBase):
         await new_obj.save(async_session)
         return new_obj
 
+    @classmethod
+    async def bulk_create(
+        cls, async_session: AsyncSession, rows: Sequence[dict[str, Any]], *, ignore_conflicts: bool = False
+    ) -> Sequence[Self]:
+        """Вставляет записи многострочным INSERT ... RETURNING и возвращает созданные записи.
+
+        При ignore_conflicts существующие записи пропускаются (ON CONFLICT DO NOTHING)
+        и не попадают в результат. События маппера (app.models.triggers) не вызываются.
+        """
+        if not rows:
+            return []
+        stmt = insert(cls).returning(cls)
+        if ignore_conflicts:
+            stmt = stmt.on_conflict_do_nothing()
+        try:
+            result = await async_session.scalars(stmt, rows)
+            new_objs = result.all()
+            await commit_or_flush(async_session)
+        except IntegrityError as e:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"{e.orig}")
+        return new_objs
+
+    @classmethod
+    async def bulk_update(
+        cls,
+        async_session: AsyncSession,
+        rows: Sequence[dict[str, Any]],
+        *criterion: ColumnExpressionArgument[bool],
+    ) -> Sequence[Self]:
+        """Обновляет записи по первичному ключу одним запросом UPDATE ... FROM (VALUES ...) RETURNING.
+
+        Каждый словарь rows содержит первичный ключ и новые значения, набор ключей у всех словарей
+        одинаковый. Записи, не подходящие под criterion, не обновляются и не попадают в результат.
+        События маппера (app.models.triggers) не вызываются.
+        """
+        if not rows:
+            return []
+        mapper = cls.__mapper__
+        attr_names = list(rows[0])
+        columns = {name: mapper.attrs[name].columns[0] for name in attr_names}
+        data = values(*(column(c.name, c.type) for c in columns.values()), name="data").data(
+            [tuple(row[name] for name in attr_names) for row in rows]
+        )
+        stmt = (
+            update(cls)
+            .where(*(pk == data.c[pk.name] for pk in mapper.primary_key), *criterion)
+            .values({name: data.c[c.name] for name, c in columns.items() if not c.primary_key})
+            .returning(cls)
+            .execution_options(populate_existing=True)
+        )
+        try:
+            result = await async_session.scalars(stmt)
+            updated_objs = result.all()
+            await commit_or_flush(async_session)
+        except IntegrityError as e:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"{e.orig}")
+        return updated_objs
+
+    @classmethod
+    async def bulk_delete(
+        cls, async_session: AsyncSession, *criterion: ColumnExpressionArgument[bool]
+    ) -> Sequence[Self]:
+        """Удаляет записи одним запросом DELETE ... RETURNING и возвращает удаленные записи.
+
+        События маппера (app.models.triggers) не вызываются.
+        """
+        stmt = delete(cls).where(*criterion).returning(cls)
+        result = await async_session.scalars(stmt)
+        deleted_objs = result.all()
+        await commit_or_flush(async_session)
+        return deleted_objs
+
     async def update(
         self,
         session: AsyncSession,
@@ -83,14 +293,17 @@ class Base(AsyncAttrs, DeclarativeBase):
     async def save(self, async_session: AsyncSession) -> None:
         try:
             async_session.add(self)
-            await async_session.commit()
-            await async_session.refresh(self)
+            await commit_or_flush(async_session)
         except IntegrityError as e:
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"{e.orig}")
+        # Перечитываем только значения, которые сгенерировала БД и которые не вернулись после INSERT/UPDATE
+        expired_attributes = inspect(self).expired_attributes
+        if expired_attributes:
+            await async_session.refresh(self, attribute_names=expired_attributes)
 
     async def delete(self, async_session: AsyncSession) -> None:
         await async_session.delete(self)
-        await async_session.commit()
+        await commit_or_flush(async_session)
 
     def convert_to(self, schema: Type[BaseModel]) -> BaseModel:
         return schema.model_validate(self)
@@ -1,6 +1,49 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from typing import Any
+from uuid import uuid4
+
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 
 from app import settings
+from app.database.pool import InstrumentedAsyncPool
+from app.database.query_stats import instrument_engine
+from app.database.slow_queries import slow_query_log
+
+
+def _create_engine(url: str, **server_settings: Any) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        poolclass=InstrumentedAsyncPool,
+        pool_size=settings.postgres.pool_size,
+        max_overflow=settings.postgres.max_overflow,
+        pool_timeout=settings.postgres.pool_timeout_in_sec,
+        pool_recycle=settings.postgres.pool_recycle_in_sec,
+        pool_pre_ping=settings.postgres.pool_pre_ping,
+        connect_args={
+            "prepared_statement_cache_size": settings.postgres.prepared_statement_cache_size,
+            # Уникальные имена подготовленных запросов: за pgbouncer в режиме transaction соседние
+            # транзакции попадают на разные соединения сервера, и одинаковые имена конфликтуют
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            "server_settings": server_settings,
+        },
+    )
+    instrument_engine(engine)
+    slow_query_log.install(engine)
+    return engine
 
-async_engine = create_async_engine(settings.postgres.get_url(driver="asyncpg"))
+
+async_engine = _create_engine(settings.postgres.get_url(driver="asyncpg"))
 make_async_session = async_sessionmaker(async_engine, expire_on_commit=False)
+
+# Транзакции на реплике только читающие, даже если реплика указывает на основную БД
+async_replica_engine = (
+    _create_engine(
+        settings.postgres.get_url(driver="asyncpg", replica=True), default_transaction_read_only="on"
+    )
+    if settings.postgres.replica_host
+    else None
+)
+make_async_read_session = (
+    async_sessionmaker(async_replica_engine, expire_on_commit=False)
+    if async_replica_engine is not None
+    else make_async_session
+)
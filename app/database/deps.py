@@ -1,14 +1,61 @@
 from typing import Annotated
 
-from fastapi import Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.database.core import make_async_session
+from app import settings
+from app.database.base import UNIT_OF_WORK
+from app.database.core import make_async_read_session, make_async_session
+
+# Cookie выставляется после успешного изменения данных, заголовок позволяет клиенту
+# явно запросить чтение из основной БД
+READ_YOUR_WRITES_COOKIE = "read_your_writes"
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
 
 
 async def get_db() -> AsyncSession:
-    async with make_async_session() as async_session:
+    """Сессия, работающая как единица работы: методы моделей только отправляют изменения в БД,
+    а транзакция фиксируется один раз после обработки запроса или откатывается при исключении.
+
+    FastAPI 0.115 завершает зависимости до отправки ответа, поэтому ошибка фиксации
+    возвращается клиенту как HTTP 422, а не теряется после успешного ответа.
+    """
+    async with make_async_session(info={UNIT_OF_WORK: True}) as async_session:
+        try:
+            yield async_session
+        except Exception:
+            await async_session.rollback()
+            raise
+        try:
+            await async_session.commit()
+        except IntegrityError as e:
+            await async_session.rollback()
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"{e.orig}")
+
+
+def get_read_session_maker(request: Request) -> async_sessionmaker[AsyncSession]:
+    """Реплика, если клиент недавно не изменял данные и не просил читать из основной БД."""
+    if READ_YOUR_WRITES_COOKIE in request.cookies or READ_YOUR_WRITES_HEADER in request.headers:
+        return make_async_session
+    return make_async_read_session
+
+
+async def get_read_db(request: Request) -> AsyncSession:
+    """Сессия только для чтения. Изменения, сделанные через нее, не фиксируются."""
+    async with get_read_session_maker(request)() as async_session:
         yield async_session
 
 
+async def read_your_writes_middleware(request: Request, call_next) -> Response:
+    response = await call_next(request)
+    if request.method not in SAFE_METHODS and response.status_code < 400:
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE, "1", max_age=settings.postgres.read_your_writes_in_sec, httponly=True
+        )
+    return response
+
+
 DBSessionDep = Annotated[AsyncSession, Depends(get_db)]
+ReadDBSessionDep = Annotated[AsyncSession, Depends(get_read_db)]
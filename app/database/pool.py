@@ -0,0 +1,56 @@
+import os
+import time
+from collections import deque
+from statistics import quantiles
+from typing import Any
+
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Пул соединений, который считает время ожидания соединения и таймауты выдачи.
+
+    Время ожидания включает открытие нового соединения, если пул создает его сверх pool_size.
+    Метрики относятся к текущему процессу (uvicorn воркеру).
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._checkouts = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._recent_waits: deque[float] = deque(maxlen=1000)
+
+    def _do_get(self) -> Any:
+        started_at = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except TimeoutError:
+            self._timeouts += 1
+            raise
+        wait = time.perf_counter() - started_at
+        self._checkouts += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+        self._recent_waits.append(wait)
+        return conn
+
+    def get_metrics(self) -> dict:
+        recent = list(self._recent_waits)
+        return {
+            "pid": os.getpid(),
+            "pool_size": self.size(),
+            "max_overflow": self._max_overflow,
+            "in_use": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(0, self.overflow()),
+            "checkouts": self._checkouts,
+            "timeouts": self._timeouts,
+            "avg_wait_in_ms": self._total_wait / self._checkouts * 1000 if self._checkouts else None,
+            "max_wait_in_ms": self._max_wait * 1000,
+            "p95_wait_in_ms": (
+                quantiles(recent, n=20, method="inclusive")[-1] * 1000 if len(recent) > 1 else None
+            ),
+        }
@@ -0,0 +1,132 @@
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app import settings
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Query-Time-Ms"
+REPEATED_QUERIES_HEADER = "X-DB-Repeated-Queries"
+
+_PARAMS_LIST_RE = re.compile(r"\$\d+(?:::\w+)?(?:, \$\d+(?:::\w+)?)*")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def get_statement_shape(statement: str) -> str:
+    """Текст запроса без параметров: запросы, отличающиеся только значениями (в том числе
+    длиной списков IN), имеют одинаковую форму.
+    """
+    return _WHITESPACE_RE.sub(" ", _PARAMS_LIST_RE.sub("?", statement)).strip()
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes: Counter[str] = Counter()
+
+    def add(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        self.shapes[get_statement_shape(statement)] += 1
+
+    @property
+    def repeated_count(self) -> int:
+        """Сколько запросов повторяли форму уже выполненного запроса (признак N+1)."""
+        return sum(count - 1 for count in self.shapes.values())
+
+    def get_repeated_shapes(self) -> Dict[str, int]:
+        return {shape: count for shape, count in self.shapes.most_common() if count > 1}
+
+
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _query_stats.get() is not None:
+        conn.info["query_started_at"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _query_stats.get()
+    started_at = conn.info.pop("query_started_at", None)
+    if stats is not None and started_at is not None:
+        stats.add(statement, time.perf_counter() - started_at)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Считает запросы к БД, выполненные в текущем контексте (задаче asyncio)."""
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def check_query_budget(count: int, repeated_count: int, max_queries: int, max_repeated: int) -> None:
+    if count > max_queries or repeated_count > max_repeated:
+        raise AssertionError(
+            f"Query budget exceeded: {count} queries (budget {max_queries}), "
+            f"{repeated_count} repeated (budget {max_repeated})"
+        )
+
+
+@contextmanager
+def query_budget(max_queries: int, max_repeated: int = 0) -> Iterator[QueryStats]:
+    """Проверяет, что код внутри блока выполнил не больше max_queries запросов
+    и не больше max_repeated повторов одной формы запроса.
+
+    with query_budget(3):
+        await get_channel_list(...)
+    """
+    with track_queries() as stats:
+        yield stats
+    try:
+        check_query_budget(stats.count, stats.repeated_count, max_queries, max_repeated)
+    except AssertionError as e:
+        raise AssertionError(f"{e}. Repeated: {stats.get_repeated_shapes()}") from None
+
+
+def assert_query_budget(response: Any, max_queries: int, max_repeated: int = 0) -> None:
+    """Проверяет бюджет запросов маршрута по заголовкам ответа (нужен SERVER_DEBUG=true).
+
+    response = client.get("/channel/list/", headers=headers)
+    assert_query_budget(response, max_queries=2)
+    """
+    if QUERY_COUNT_HEADER not in response.headers:
+        raise AssertionError(f"Response has no {QUERY_COUNT_HEADER} header, is SERVER_DEBUG enabled?")
+    check_query_budget(
+        int(response.headers[QUERY_COUNT_HEADER]),
+        int(response.headers[REPEATED_QUERIES_HEADER]),
+        max_queries,
+        max_repeated,
+    )
+
+
+async def query_stats_middleware(request: Request, call_next) -> Response:
+    """В режиме отладки возвращает статистику запросов к БД в заголовках ответа.
+
+    Запросы, выполненные при потоковой отправке тела ответа, не учитываются.
+    """
+    if not settings.server.debug:
+        return await call_next(request)
+    with track_queries() as stats:
+        response = await call_next(request)
+    response.headers[QUERY_COUNT_HEADER] = str(stats.count)
+    response.headers[QUERY_TIME_HEADER] = f"{stats.total_time * 1000:.2f}"
+    response.headers[REPEATED_QUERIES_HEADER] = str(stats.repeated_count)
+    return response
@@ -0,0 +1,189 @@
+"""Журнал медленных запросов.
+
+Запросы дольше SLOW_QUERY_THRESHOLD_IN_MS попадают в очередь, которую разбирает фоновая задача:
+обработчик событий движка только кладет запись в очередь и не ждет ввода-вывода, а запись
+в журнал выполняется в отдельном потоке.
+Для медленных SELECT фоновая задача (не чаще SLOW_QUERY_EXPLAIN_PER_MIN раз в минуту)
+повторяет запрос с EXPLAIN (ANALYZE, BUFFERS) в транзакции только для чтения.
+Значения параметров в журнал не пишутся, только их типы.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app import settings
+from app.utils.rate_limit import LocalRateLimitBackend
+
+logger = logging.getLogger(__name__)
+
+_current_request: ContextVar[Request | None] = ContextVar("slow_query_request", default=None)
+
+
+def redact_parameters(parameters: Any) -> Any:
+    if isinstance(parameters, (list, tuple)):
+        return [redact_parameters(value) for value in parameters]
+    if isinstance(parameters, dict):
+        return {key: redact_parameters(value) for key, value in parameters.items()}
+    if parameters is None or isinstance(parameters, bool):
+        return parameters
+    if isinstance(parameters, (str, bytes)):
+        return f"<{type(parameters).__name__}:{len(parameters)}>"
+    return f"<{type(parameters).__name__}>"
+
+
+def _get_route(request: Request | None) -> str | None:
+    if request is None:
+        return None
+    route = request.scope.get("route")
+    return f"{request.method} {route.path if route is not None else request.url.path}"
+
+
+class SlowQueryLog:
+    def __init__(self, threshold_in_ms: int | None, explain_per_min: int, queue_size: int):
+        self.threshold = threshold_in_ms / 1000 if threshold_in_ms is not None else None
+        self.explain_per_min = explain_per_min
+        self._queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue(maxsize=queue_size)
+        self._explain_limiter = LocalRateLimitBackend(maxsize=1)
+        self._worker: asyncio.Task | None = None
+        self._logged = 0
+        self._explained = 0
+        self._dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold is not None
+
+    def install(self, engine: AsyncEngine) -> None:
+        if not self.enabled:
+            return
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+            conn.info["slow_query_started_at"] = time.perf_counter()
+
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+            started_at = conn.info.pop("slow_query_started_at", None)
+            if started_at is None:
+                return
+            duration = time.perf_counter() - started_at
+            if duration >= self.threshold and not statement.lstrip().upper().startswith("EXPLAIN"):
+                self._put(
+                    {
+                        "engine": engine,
+                        "statement": statement,
+                        "parameters": parameters,
+                        "executemany": executemany,
+                        "duration": duration,
+                        "route": _get_route(_current_request.get()),
+                    }
+                )
+
+        event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+    def _put(self, entry: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self._dropped += 1
+
+    async def _explain(self, entry: Dict[str, Any]) -> List[Any] | None:
+        if entry["executemany"] or not entry["statement"].lstrip().upper().startswith("SELECT"):
+            return None
+        if self.explain_per_min == 0:
+            return None
+        if await self._explain_limiter.consume("explain", self.explain_per_min, self.explain_per_min / 60):
+            return None
+        async with entry["engine"].connect() as conn:
+            # ANALYZE исполняет запрос, поэтому только в транзакции, запрещающей изменения
+            await conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+            result = await conn.exec_driver_sql(
+                "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + entry["statement"], entry["parameters"] or ()
+            )
+            plan = result.scalar_one()
+            await conn.rollback()
+        self._explained += 1
+        return json.loads(plan) if isinstance(plan, str) else plan
+
+    async def _process(self, entry: Dict[str, Any]) -> None:
+        try:
+            plan = await self._explain(entry)
+            error = None
+        except Exception as e:
+            plan, error = None, e
+        self._logged += 1
+        # Сериализация плана и обработчики журнала (файл, syslog) блокируют, поэтому не в цикле событий
+        await asyncio.to_thread(self._write, entry, plan, error)
+
+    @staticmethod
+    def _write(entry: Dict[str, Any], plan: List[Any] | None, error: Exception | None) -> None:
+        if error is not None:
+            logger.warning("Failed to explain slow query: %r", error)
+        logger.warning(
+            "Slow query: %s",
+            json.dumps(
+                {
+                    "duration_in_ms": round(entry["duration"] * 1000, 2),
+                    "route": entry["route"],
+                    "statement": entry["statement"],
+                    "parameters": redact_parameters(entry["parameters"]),
+                    "plan": plan,
+                },
+                ensure_ascii=False,
+                default=str,
+            ),
+        )
+
+    async def _run(self) -> None:
+        while True:
+            entry = await self._queue.get()
+            try:
+                await self._process(entry)
+            finally:
+                self._queue.task_done()
+
+    def start(self) -> None:
+        if self.enabled and self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    def get_metrics(self) -> dict:
+        return {
+            "threshold_in_ms": self.threshold * 1000 if self.enabled else None,
+            "queued": self._queue.qsize(),
+            "logged": self._logged,
+            "explained": self._explained,
+            "dropped": self._dropped,
+        }
+
+
+async def slow_query_middleware(request: Request, call_next) -> Response:
+    """Запоминает запрос, чтобы журнал медленных запросов мог указать маршрут."""
+    token = _current_request.set(request)
+    try:
+        return await call_next(request)
+    finally:
+        _current_request.reset(token)
+
+
+slow_query_log = SlowQueryLog(
+    threshold_in_ms=settings.slow_query.threshold_in_ms,
+    explain_per_min=settings.slow_query.explain_per_min,
+    queue_size=settings.slow_query.queue_size,
+)
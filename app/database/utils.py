@@ -1,7 +1,8 @@
-from typing import Any, Tuple, Type, TypeVar, Union
+from typing import Any, Sequence, Tuple, Type, TypeVar, Union
 
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.base import ExecutableOption
 
 from app.database import Base
 
@@ -9,9 +10,13 @@ _T = TypeVar("_T", bound=Base)
 
 
 async def get_or_404(
-    model_cls: Type[_T], async_session: AsyncSession, **pk: Union[Any, Tuple[Any, ...]]
+    model_cls: Type[_T],
+    async_session: AsyncSession,
+    *,
+    options: Sequence[ExecutableOption] = (),
+    **pk: Union[Any, Tuple[Any, ...]],
 ) -> _T:
-    obj = await model_cls.get(async_session, **pk)
+    obj = await model_cls.get(async_session, options=options, **pk)
     if obj is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{model_cls.__name__} not found.")
     return obj
@@ -0,0 +1,73 @@
+"""Доставка писем из очереди email_outbox.
+
+Запуск: python -m app.jobs.email_outbox
+
+Письма забираются пачками: строки закрепляются за обработчиком (FOR UPDATE SKIP LOCKED, поэтому
+можно запускать несколько процессов) на EMAIL_OUTBOX_LEASE_IN_SEC, и транзакция фиксируется до
+отправки, чтобы SMTP не держал открытыми транзакцию и блокировки строк. Письма отправляются через
+одно переиспользуемое SMTP соединение, результат каждой отправки сохраняется сразу. При ошибке
+отправка повторяется с экспоненциально растущей задержкой, но не более EMAIL_OUTBOX_MAX_ATTEMPTS раз.
+"""
+
+import asyncio
+import logging
+import smtplib
+from datetime import timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import settings
+from app.database.core import make_async_session
+from app.models import EmailOutbox
+from app.utils.e_mail import SMTPMailer
+from app.utils.time import utc_now
+
+logger = logging.getLogger(__name__)
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=settings.email.outbox_retry_delay_in_sec * 2 ** (attempts - 1))
+
+
+async def deliver_batch(db_session: AsyncSession, mailer: SMTPMailer) -> int:
+    """Отправляет одну пачку писем, возвращает количество закрепленных писем."""
+    lease_until = utc_now() + timedelta(seconds=settings.email.outbox_lease_in_sec)
+    emails = await EmailOutbox.claim_due(
+        db_session, settings.email.outbox_batch_size, settings.email.outbox_max_attempts, lease_until
+    )
+    for position, email in enumerate(emails):
+        if utc_now() >= lease_until:
+            # Оставшиеся письма уже могли закрепить другие обработчики
+            logger.warning("Email lease expired, %s emails left unsent", len(emails) - position)
+            break
+        try:
+            await asyncio.to_thread(mailer.send, email.receiver, email.subject, email.body)
+        except (smtplib.SMTPException, OSError) as e:
+            await asyncio.to_thread(mailer.close)
+            email.last_error = repr(e)
+            email.next_attempt_at = utc_now() + _retry_delay(email.attempts)
+            logger.warning("Failed to send email %s (attempt %s): %r", email.id, email.attempts, e)
+        else:
+            email.sent_at = utc_now()
+        db_session.add(email)
+        await db_session.commit()
+    return len(emails)
+
+
+async def main() -> None:
+    mailer = SMTPMailer()
+    try:
+        async with make_async_session() as db_session:
+            while True:
+                if await deliver_batch(db_session, mailer):
+                    continue
+                # Очередь пуста: не держим соединение открытым, пока ждем новые письма
+                await asyncio.to_thread(mailer.close)
+                await asyncio.sleep(settings.email.outbox_poll_interval_in_sec)
+    finally:
+        mailer.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
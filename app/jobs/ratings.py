@@ -0,0 +1,118 @@
+"""Сверка рейтингов мероприятий и каналов.
+
+Запуск: python -m app.jobs.ratings
+
+Триггеры отзывов изменяют rating_sum и rating_count на разницу, поэтому ошибка
+(например, изменение отзывов в обход триггеров) не исправляется сама. Задание пересчитывает
+суммы мероприятий по отзывам, а затем суммы каналов по мероприятиям, пачками по
+JOBS_RATING_REPAIR_BATCH_SIZE первичных ключей в коротких транзакциях. Изменяются только
+расходящиеся строки.
+"""
+
+import asyncio
+import logging
+
+from sqlalchemy import ColumnElement, func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import settings
+from app.database.core import make_async_session
+from app.models import Channel, Feedback, Meeting
+from app.models.feedback import average_rating
+
+logger = logging.getLogger(__name__)
+
+
+async def _get_batch_end(
+    db_session: AsyncSession, key: ColumnElement[int], after: int, batch_size: int
+) -> int | None:
+    batch = select(key.label("key")).where(key > after).order_by(key).limit(batch_size).subquery()
+    return await db_session.scalar(select(func.max(batch.c.key)))
+
+
+async def repair_meeting_ratings(db_session: AsyncSession, batch_size: int) -> int:
+    """Пересчитывает суммы оценок мероприятий по отзывам, возвращает количество исправленных."""
+    repaired = 0
+    after = 0
+    while (last := await _get_batch_end(db_session, Meeting.id, after, batch_size)) is not None:
+        totals = (
+            select(
+                Meeting.id.label("meeting_id"),
+                func.coalesce(func.sum(Feedback.rate), 0).label("rating_sum"),
+                func.count(Feedback.rate).label("rating_count"),
+            )
+            .outerjoin(Feedback, Feedback.meeting_id == Meeting.id)
+            .where(Meeting.id > after, Meeting.id <= last)
+            .group_by(Meeting.id)
+            .subquery()
+        )
+        stmt = (
+            update(Meeting)
+            .where(
+                Meeting.id == totals.c.meeting_id,
+                tuple_(Meeting.rating_sum, Meeting.rating_count).is_distinct_from(
+                    tuple_(totals.c.rating_sum, totals.c.rating_count)
+                ),
+            )
+            .values(
+                rating_sum=totals.c.rating_sum,
+                rating_count=totals.c.rating_count,
+                rating=average_rating(totals.c.rating_sum, totals.c.rating_count),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        repaired += (await db_session.execute(stmt)).rowcount
+        await db_session.commit()
+        after = last
+    return repaired
+
+
+async def repair_channel_ratings(db_session: AsyncSession, batch_size: int) -> int:
+    """Пересчитывает суммы оценок каналов по мероприятиям, возвращает количество исправленных."""
+    repaired = 0
+    after = 0
+    while (last := await _get_batch_end(db_session, Channel.id, after, batch_size)) is not None:
+        totals = (
+            select(
+                Channel.id.label("channel_id"),
+                func.coalesce(func.sum(Meeting.rating_sum), 0).label("rating_sum"),
+                func.coalesce(func.sum(Meeting.rating_count), 0).label("rating_count"),
+            )
+            .outerjoin(Meeting, Meeting.channel_id == Channel.id)
+            .where(Channel.id > after, Channel.id <= last)
+            .group_by(Channel.id)
+            .subquery()
+        )
+        stmt = (
+            update(Channel)
+            .where(
+                Channel.id == totals.c.channel_id,
+                tuple_(Channel.rating_sum, Channel.rating_count).is_distinct_from(
+                    tuple_(totals.c.rating_sum, totals.c.rating_count)
+                ),
+            )
+            .values(
+                rating_sum=totals.c.rating_sum,
+                rating_count=totals.c.rating_count,
+                rating=average_rating(totals.c.rating_sum, totals.c.rating_count),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        repaired += (await db_session.execute(stmt)).rowcount
+        await db_session.commit()
+        after = last
+    return repaired
+
+
+async def main() -> None:
+    async with make_async_session() as db_session:
+        batch_size = settings.jobs.rating_repair_batch_size
+        repaired = await repair_meeting_ratings(db_session, batch_size)
+        logger.info("Repaired ratings of %s meetings", repaired)
+        repaired = await repair_channel_ratings(db_session, batch_size)
+        logger.info("Repaired ratings of %s channels", repaired)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,268 @@
+"""Рекомендации мероприятий по любимым категориям пользователей.
+
+Запуск: python -m app.jobs.recommendations
+
+Предстоящие мероприятия загружаются один раз: матрица мероприятие-категория, канал и рейтинг.
+Пользователи обрабатываются пачками по JOBS_RECOMMENDATION_CHUNK_SIZE: для пачки загружаются
+любимые категории и участие в каналах, оценка всех мероприятий считается матрично
+(косинусная близость категорий + вес участия в канале + вес рейтинга), недоступные
+и уже выбранные мероприятия исключаются, лучшие JOBS_RECOMMENDATIONS_PER_USER
+сохраняются в meeting_recommendation одной вставкой на пачку.
+"""
+
+import asyncio
+import logging
+import time
+from typing import NamedTuple, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import settings
+from app.database.core import make_async_session
+from app.models import Category, Channel, ChannelMember, Meeting, MeetingRecommendation, User
+from app.models.channel_member import Permission
+from app.models.secondary_tables import favorite_category, meeting_category, meeting_member
+from app.utils.time import datetime_now
+
+logger = logging.getLogger(__name__)
+
+# Состояния пользователя в канале в матрице участия
+NOT_MEMBER = 0
+CAN_SEE_MEETINGS = 1
+CANNOT_SEE_MEETINGS = 2
+
+
+class Candidates(NamedTuple):
+    """Предстоящие мероприятия активных каналов, упорядоченные по meeting_id."""
+
+    meeting_ids: np.ndarray  # (M,)
+    # Индекс канала мероприятия в channel_ids
+    channel_index: np.ndarray  # (M,)
+    channel_ids: np.ndarray  # (K,) по возрастанию
+    is_public: np.ndarray  # (K,)
+    category_ids: np.ndarray  # (C,) по возрастанию
+    # Строки нормированы, мероприятие без категорий - нулевая строка
+    categories: np.ndarray  # (M, C)
+    # rating / 5, мероприятие без оценок - 0
+    rating: np.ndarray  # (M,)
+    # Участники мероприятий, пары упорядочены по user_id
+    member_user_ids: np.ndarray
+    member_meeting_index: np.ndarray
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def _to_array(rows, columns: int, dtype=np.int64) -> np.ndarray:
+    return np.array(rows, dtype=dtype).reshape(-1, columns)
+
+
+async def load_candidates(db_session: AsyncSession) -> Candidates:
+    upcoming = (
+        select(Meeting.id)
+        .join(Channel, Channel.id == Meeting.channel_id)
+        .where(Meeting.start_datetime > datetime_now(), Channel.is_active == True)  # noqa: E712
+    )
+    category_ids = np.array((await db_session.scalars(select(Category.id).order_by(Category.id))).all())
+    meetings = (
+        await db_session.execute(
+            upcoming.add_columns(Meeting.channel_id, Meeting.rating, Channel.is_public).order_by(Meeting.id)
+        )
+    ).all()
+    meeting_ids = np.array([row.id for row in meetings], dtype=np.int64)
+    meeting_channel_ids = np.array([row.channel_id for row in meetings], dtype=np.int64)
+    channel_ids, first_meeting, channel_index = np.unique(
+        meeting_channel_ids, return_index=True, return_inverse=True
+    )
+    is_public = np.array([row.is_public for row in meetings], dtype=bool)[first_meeting]
+    rating = np.array([row.rating or 0 for row in meetings], dtype=np.float32) / 5
+
+    pairs = _to_array(
+        (
+            await db_session.execute(
+                select(meeting_category.c.meeting_id, meeting_category.c.category_id).where(
+                    meeting_category.c.meeting_id.in_(upcoming)
+                )
+            )
+        ).all(),
+        2,
+    )
+    categories = np.zeros((len(meeting_ids), len(category_ids)), dtype=np.float32)
+    categories[np.searchsorted(meeting_ids, pairs[:, 0]), np.searchsorted(category_ids, pairs[:, 1])] = 1
+
+    members = _to_array(
+        (
+            await db_session.execute(
+                select(meeting_member.c.user_id, meeting_member.c.meeting_id)
+                .where(meeting_member.c.meeting_id.in_(upcoming))
+                .order_by(meeting_member.c.user_id)
+            )
+        ).all(),
+        2,
+    )
+    return Candidates(
+        meeting_ids=meeting_ids,
+        channel_index=channel_index.reshape(-1),
+        channel_ids=channel_ids,
+        is_public=is_public,
+        category_ids=category_ids,
+        categories=_normalize_rows(categories),
+        rating=rating,
+        member_user_ids=members[:, 0],
+        member_meeting_index=np.searchsorted(meeting_ids, members[:, 1]),
+    )
+
+
+async def load_users(
+    db_session: AsyncSession, candidates: Candidates, user_ids: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Матрицы пачки пользователей: любимые категории (U, C), участие в каналах (U, K)
+    и выбранные мероприятия (U, M). Строки читаются по диапазону user_id пачки.
+    """
+    first, last = int(user_ids[0]), int(user_ids[-1])
+
+    def rows_of(row_user_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        rows = np.searchsorted(user_ids, row_user_ids)
+        found = rows < len(user_ids)
+        found[found] = user_ids[rows[found]] == row_user_ids[found]
+        return rows, found
+
+    favorites = _to_array(
+        (
+            await db_session.execute(
+                select(favorite_category.c.user_id, favorite_category.c.category_id).where(
+                    favorite_category.c.user_id.between(first, last)
+                )
+            )
+        ).all(),
+        2,
+    )
+    rows, found = rows_of(favorites[:, 0])
+    user_categories = np.zeros((len(user_ids), len(candidates.category_ids)), dtype=np.float32)
+    user_categories[rows[found], np.searchsorted(candidates.category_ids, favorites[found, 1])] = 1
+
+    channel_members = _to_array(
+        (
+            await db_session.execute(
+                select(ChannelMember.user_id, ChannelMember.channel_id, ChannelMember.permissions).where(
+                    ChannelMember.user_id.between(first, last)
+                )
+            )
+        ).all(),
+        3,
+    )
+    rows, found = rows_of(channel_members[:, 0])
+    # Каналы без предстоящих мероприятий не нужны
+    channels = np.searchsorted(candidates.channel_ids, channel_members[:, 1])
+    found &= channels < len(candidates.channel_ids)
+    found[found] = candidates.channel_ids[channels[found]] == channel_members[found, 1]
+    membership = np.full((len(user_ids), len(candidates.channel_ids)), NOT_MEMBER, dtype=np.int8)
+    membership[rows[found], channels[found]] = np.where(
+        channel_members[found, 2] & Permission.SEE_MEETINGS, CAN_SEE_MEETINGS, CANNOT_SEE_MEETINGS
+    )
+
+    start, stop = np.searchsorted(candidates.member_user_ids, [first, last + 1])
+    rows, found = rows_of(candidates.member_user_ids[start:stop])
+    joined = np.zeros((len(user_ids), len(candidates.meeting_ids)), dtype=bool)
+    joined[rows[found], candidates.member_meeting_index[start:stop][found]] = True
+    return user_categories, membership, joined
+
+
+def score_meetings(
+    candidates: Candidates,
+    user_categories: np.ndarray,
+    membership: np.ndarray,
+    joined: np.ndarray,
+    limit: int,
+    channel_weight: float,
+    rating_weight: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Индексы лучших limit мероприятий для каждого пользователя по убыванию оценки и их оценки.
+    Недоступные мероприятия получают оценку -inf.
+    """
+    membership = membership[:, candidates.channel_index]  # (U, M)
+    scores = user_categories @ candidates.categories.T
+    scores += channel_weight * (membership == CAN_SEE_MEETINGS)
+    scores += rating_weight * candidates.rating
+    # Те же правила, что и Meeting.visible_to
+    visible = (membership == CAN_SEE_MEETINGS) | (
+        (membership == NOT_MEMBER) & candidates.is_public[candidates.channel_index]
+    )
+    scores[~visible | joined] = -np.inf
+
+    limit = min(limit, scores.shape[1])
+    top = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+async def get_user_chunk(db_session: AsyncSession, after_user_id: int, chunk_size: int) -> np.ndarray:
+    stmt = (
+        select(User.id)
+        .where(User.id > after_user_id, User.is_active == True)  # noqa: E712
+        .order_by(User.id)
+        .limit(chunk_size)
+    )
+    return np.array((await db_session.scalars(stmt)).all(), dtype=np.int64)
+
+
+async def recommend_users(
+    db_session: AsyncSession, candidates: Candidates, after_user_id: int, user_ids: np.ndarray
+) -> None:
+    """Пересчитывает рекомендации пачки пользователей, user_ids идут подряд после after_user_id."""
+    if len(candidates.meeting_ids) > 0:
+        user_categories, membership, joined = await load_users(db_session, candidates, user_ids)
+        top, top_scores = score_meetings(
+            candidates,
+            _normalize_rows(user_categories),
+            membership,
+            joined,
+            settings.jobs.recommendations_per_user,
+            settings.jobs.recommendation_channel_weight,
+            settings.jobs.recommendation_rating_weight,
+        )
+        rows, positions = np.nonzero(np.isfinite(top_scores))
+        meeting_ids = candidates.meeting_ids[top[rows, positions]]
+        scores = top_scores[rows, positions]
+    else:
+        rows = positions = meeting_ids = np.empty(0, dtype=np.int64)
+        scores = np.empty(0, dtype=np.float32)
+    await MeetingRecommendation.replace_range(
+        db_session,
+        after_user_id,
+        int(user_ids[-1]),
+        user_ids[rows].tolist(),
+        (positions + 1).tolist(),
+        meeting_ids.tolist(),
+        scores.tolist(),
+    )
+
+
+async def main() -> None:
+    started_at = time.perf_counter()
+    async with make_async_session() as db_session:
+        candidates = await load_candidates(db_session)
+        logger.info(
+            "Loaded %s upcoming meetings in %s channels, %s categories",
+            len(candidates.meeting_ids),
+            len(candidates.channel_ids),
+            len(candidates.category_ids),
+        )
+        users = 0
+        after_user_id = 0
+        chunk_size = settings.jobs.recommendation_chunk_size
+        while len(user_ids := await get_user_chunk(db_session, after_user_id, chunk_size)) > 0:
+            await recommend_users(db_session, candidates, after_user_id, user_ids)
+            users += len(user_ids)
+            after_user_id = int(user_ids[-1])
+    logger.info("Recommendations for %s users computed in %.1f s", users, time.perf_counter() - started_at)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
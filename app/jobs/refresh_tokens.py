@@ -0,0 +1,145 @@
+"""Обслуживание таблицы refresh_token.
+
+Запуск: python -m app.jobs.refresh_tokens
+
+- создает секции refresh_token на текущий и несколько следующих месяцев, токены этих месяцев,
+  попавшие в секцию по умолчанию (задание давно не запускалось), переносятся в новую секцию;
+- удаляет секции, в которых все токены уже истекли;
+- пачками удаляет истекшие и деактивированные токены из оставшихся секций.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import settings
+from app.database.core import make_async_session
+from app.models import RefreshToken
+from app.utils.time import utc_now
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "refresh_token_p"
+DEFAULT_PARTITION = "refresh_token_default"
+
+COLUMNS = "id, issues_at, expires_at, is_active, is_staff, user_id"
+
+
+def _add_months(month_start: datetime, months: int) -> datetime:
+    month_index = month_start.month - 1 + months
+    return month_start.replace(year=month_start.year + month_index // 12, month=month_index % 12 + 1)
+
+
+def _partition_name(month_start: datetime) -> str:
+    return f"{PARTITION_PREFIX}{month_start:%Y%m}"
+
+
+async def _create_partition(db_session: AsyncSession, name: str, month_start: datetime) -> None:
+    """Создает секцию месяца. Если в секции по умолчанию есть строки этого месяца, PostgreSQL
+    не даст создать секцию: секция по умолчанию отсоединяется, строки переносятся в новую секцию
+    и секция по умолчанию присоединяется обратно. Все в одной транзакции, на это время
+    refresh_token заблокирована.
+    """
+    bounds = {"from": month_start, "to": _add_months(month_start, 1)}
+    partition_of = (
+        f"partition of refresh_token for values from ('{bounds['from'].isoformat()}') "
+        f"to ('{bounds['to'].isoformat()}')"
+    )
+    in_month = "expires_at >= :from and expires_at < :to"
+    has_default_rows = await db_session.scalar(
+        text(
+            f"select to_regclass('{DEFAULT_PARTITION}') is not null "
+            f"and exists (select 1 from {DEFAULT_PARTITION} where {in_month})"
+        ),
+        bounds,
+    )
+    if not has_default_rows:
+        await db_session.execute(text(f"create table {name} {partition_of}"))
+        return
+    await db_session.execute(text(f"alter table refresh_token detach partition {DEFAULT_PARTITION}"))
+    await db_session.execute(text(f"create table {name} {partition_of}"))
+    await db_session.execute(
+        text(
+            f"with moved as (delete from {DEFAULT_PARTITION} where {in_month} returning {COLUMNS}) "
+            f"insert into refresh_token ({COLUMNS}) select {COLUMNS} from moved"
+        ),
+        bounds,
+    )
+    await db_session.execute(text(f"alter table refresh_token attach partition {DEFAULT_PARTITION} default"))
+
+
+async def create_partitions(db_session: AsyncSession, months_ahead: int) -> List[str]:
+    """Создает недостающие секции, возвращает имена секций на текущий и следующие месяцы.
+    Ошибка создания секции записывается в лог и не мешает остальному обслуживанию.
+    """
+    now = utc_now()
+    current_month = datetime(now.year, now.month, 1, tzinfo=timezone.utc)
+    created = []
+    for i in range(months_ahead + 1):
+        month_start = _add_months(current_month, i)
+        name = _partition_name(month_start)
+        try:
+            if await db_session.scalar(text(f"select to_regclass('{name}') is null")):
+                await _create_partition(db_session, name, month_start)
+            await db_session.commit()
+        except DBAPIError:
+            await db_session.rollback()
+            logger.exception("Failed to create refresh token partition %s", name)
+            continue
+        created.append(name)
+    return created
+
+
+async def drop_expired_partitions(db_session: AsyncSession) -> List[str]:
+    stmt = text(
+        "select c.relname from pg_inherits i join pg_class c on c.oid = i.inhrelid "
+        "where i.inhparent = 'refresh_token'::regclass"
+    )
+    now = utc_now()
+    dropped = []
+    for name in (await db_session.execute(stmt)).scalars():
+        if not name.startswith(PARTITION_PREFIX):
+            continue
+        month_start = datetime.strptime(name.removeprefix(PARTITION_PREFIX), "%Y%m").replace(
+            tzinfo=timezone.utc
+        )
+        if _add_months(month_start, 1) <= now:
+            await db_session.execute(text(f"drop table {name}"))
+            dropped.append(name)
+    await db_session.commit()
+    return dropped
+
+
+async def purge_refresh_tokens(db_session: AsyncSession, batch_size: int, pause_in_sec: float) -> int:
+    """Удаляет токены короткими транзакциями, чтобы не держать долгих блокировок."""
+    total = 0
+    while True:
+        deleted = await RefreshToken.purge(db_session, batch_size)
+        total += deleted
+        if deleted < batch_size:
+            return total
+        await asyncio.sleep(pause_in_sec)
+
+
+async def main() -> None:
+    async with make_async_session() as db_session:
+        created = await create_partitions(db_session, settings.jobs.refresh_token_partitions_ahead)
+        logger.info("Refresh token partitions: %s", ", ".join(created))
+        dropped = await drop_expired_partitions(db_session)
+        logger.info("Dropped expired partitions: %s", ", ".join(dropped) or "-")
+        deleted = await purge_refresh_tokens(
+            db_session,
+            settings.jobs.refresh_token_purge_batch_size,
+            settings.jobs.refresh_token_purge_pause_in_sec,
+        )
+        logger.info("Deleted %s expired or inactive refresh tokens", deleted)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
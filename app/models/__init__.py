@@ -2,15 +2,23 @@ from app.database import Base
 from app.models.category import Category
 from app.models.channel import Channel
 from app.models.channel_member import ChannelMember
+from app.models.email_outbox import EmailOutbox
 from app.models.feedback import Feedback
 from app.models.meeting import Meeting
+from app.models.meeting_category import MeetingCategory
+from app.models.meeting_feed import MeetingFeed
 from app.models.meeting_memeber import MeetingMember
+from app.models.meeting_recommendation import MeetingRecommendation
+from app.models.meeting_waiter import MeetingWaiter
 from app.models.refresh_token import RefreshToken
 from app.models.triggers import (
+    add_meeting_rate_trigger,
+    change_meeting_rate_trigger,
     create_personal_channel_trigger,
     decrement_channel_members_cnt_trigger,
     increment_channel_members_cnt_trigger,
-    update_meeting_rating_trigger,
+    remove_channel_rates_trigger,
+    remove_meeting_rate_trigger,
 )
 from app.models.user import User
 
@@ -19,13 +27,21 @@ __all__ = [
     "Category",
     "Channel",
     "ChannelMember",
+    "EmailOutbox",
     "Feedback",
     "Meeting",
+    "MeetingCategory",
+    "MeetingFeed",
     "MeetingMember",
+    "MeetingRecommendation",
+    "MeetingWaiter",
     "User",
     "RefreshToken",
+    "add_meeting_rate_trigger",
+    "change_meeting_rate_trigger",
     "create_personal_channel_trigger",
     "decrement_channel_members_cnt_trigger",
     "increment_channel_members_cnt_trigger",
-    "update_meeting_rating_trigger",
+    "remove_channel_rates_trigger",
+    "remove_meeting_rate_trigger",
 ]
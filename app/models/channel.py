@@ -10,10 +10,15 @@ class Channel(Base):
     name = mapped_column(String(100), nullable=False)
     description = mapped_column(Text, nullable=True)
     members_cnt = mapped_column(Integer, nullable=False, default=0)
+    # Средняя оценка по всем отзывам на мероприятия канала, см. Meeting.rating
     rating = mapped_column(Float, nullable=True)
+    rating_sum = mapped_column(Integer, nullable=False, default=0)
+    rating_count = mapped_column(Integer, nullable=False, default=0)
     is_personal = mapped_column(Boolean, nullable=False, default=False)
     is_public = mapped_column(Boolean, nullable=False, default=False)
     is_active = mapped_column(Boolean, nullable=False, default=True)
+    # В канале есть мероприятия, не разосланные в ленты участников, см. MeetingFeed
+    has_unfanned_meetings = mapped_column(Boolean, nullable=False, default=False)
 
     members = relationship("ChannelMember", back_populates="channel")
     meetings = relationship("Meeting", back_populates="channel")
@@ -1,5 +1,5 @@
 from fastapi import HTTPException, status
-from sqlalchemy import Boolean, DateTime, ForeignKey, ForeignKeyConstraint, Integer
+from sqlalchemy import Boolean, DateTime, ForeignKey, ForeignKeyConstraint, Index, Integer
 from sqlalchemy.orm import mapped_column, relationship
 
 from app.database.base import Base
@@ -97,6 +97,8 @@ class ChannelMember(Base):
         ForeignKeyConstraint(
             ["channel_id", "user_id"], ["channel_member.channel_id", "channel_member.user_id"]
         ),
+        # Каналы пользователя (видимость мероприятий), первичный ключ начинается с channel_id
+        Index("ix_channel_member_user_id", "user_id", "channel_id"),
     )
 
     channel_id = mapped_column("channel_id", Integer, ForeignKey("channel.channel_id"), primary_key=True)
@@ -107,8 +109,10 @@ class ChannelMember(Base):
     is_owner = mapped_column(Boolean, nullable=False, default=False)
     notify_about_meeting = mapped_column(Boolean, nullable=False, default=False)
 
-    channel = relationship("Channel", back_populates="members", lazy="subquery")
-    user = relationship("User", back_populates="channel_members", lazy="subquery")
+    # Связи загружаются только явно (options=[joinedload(ChannelMember.channel)]),
+    # для проверки прав достаточно самой записи участника
+    channel = relationship("Channel", back_populates="members", lazy="raise")
+    user = relationship("User", back_populates="channel_members", lazy="raise")
 
     def has_permission_or_403(self, permission: int) -> None:
         if self.permissions & permission != permission:
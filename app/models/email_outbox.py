@@ -0,0 +1,58 @@
+from datetime import datetime
+from typing import Self, Sequence
+
+from sqlalchemy import DateTime, Index, Integer, String, Text, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import mapped_column
+
+from app.database.base import Base, commit_or_flush
+from app.utils.time import utc_now
+
+
+class EmailOutbox(Base):
+    """Исходящее письмо. Записывается в той же транзакции, что и изменение, из-за которого оно
+    отправляется, а доставляется отдельным процессом (см. app.jobs.email_outbox)."""
+
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_next_attempt_at", "next_attempt_at", postgresql_where="sent_at is null"),
+    )
+
+    id = mapped_column("email_id", Integer, primary_key=True)
+    receiver = mapped_column(String(320), nullable=False)
+    subject = mapped_column(String(256), nullable=False)
+    body = mapped_column(Text, nullable=False)
+    created_at = mapped_column(DateTime(timezone=True), nullable=False, default=utc_now)
+    attempts = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at = mapped_column(DateTime(timezone=True), nullable=False, default=utc_now)
+    sent_at = mapped_column(DateTime(timezone=True), nullable=True)
+    last_error = mapped_column(Text, nullable=True)
+
+    @classmethod
+    async def claim_due(
+        cls, db_session: AsyncSession, limit: int, max_attempts: int, lease_until: datetime
+    ) -> Sequence[Self]:
+        """Закрепляет за обработчиком до limit писем, которые пора отправить, и фиксирует транзакцию.
+
+        Закрепление - начатая попытка: attempts увеличивается, а next_attempt_at переносится
+        на lease_until, поэтому другие обработчики письмо не берут. Если обработчик не сохранит
+        результат отправки (например, упадет), письмо снова станет доступно после lease_until.
+        Строки, которые в этот момент закрепляют другие обработчики, пропускаются (SKIP LOCKED).
+        """
+        due = (
+            select(cls.id)
+            .where(cls.sent_at.is_(None), cls.next_attempt_at <= utc_now(), cls.attempts < max_attempts)
+            .order_by(cls.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .cte("due")
+        )
+        stmt = (
+            update(cls)
+            .where(cls.id.in_(select(due.c.id)))
+            .values(attempts=cls.attempts + 1, next_attempt_at=lease_until)
+            .returning(cls)
+        )
+        emails = (await db_session.scalars(stmt)).all()
+        await commit_or_flush(db_session)
+        return emails
@@ -1,4 +1,4 @@
-from sqlalchemy import CheckConstraint, ForeignKey, Integer
+from sqlalchemy import CheckConstraint, ColumnElement, Float, ForeignKey, Index, Integer, cast, func
 from sqlalchemy.orm import mapped_column, relationship
 
 from app.database.base import Base
@@ -6,9 +6,16 @@ from app.database.base import Base
 
 class Feedback(Base):
     __tablename__ = "feedback"
+    # Пересчет рейтинга мероприятия (app.jobs.ratings) и каскадное удаление мероприятий
+    __table_args__ = (Index("ix_feedback_meeting_id", "meeting_id"),)
     user_id = mapped_column(Integer, ForeignKey("person.user_id"), primary_key=True)
     meeting_id = mapped_column(Integer, ForeignKey("meeting.meeting_id"), primary_key=True)
     rate = mapped_column(Integer, CheckConstraint("rate >= 0 and rate <= 5"), nullable=False)
 
     user = relationship("User", back_populates="feedbacks")
     meeting = relationship("Meeting", back_populates="feedbacks")
+
+
+def average_rating(rating_sum: ColumnElement[int], rating_count: ColumnElement[int]) -> ColumnElement[float]:
+    """Рейтинг по сумме и количеству оценок, NULL если оценок нет."""
+    return cast(rating_sum, Float) / func.nullif(rating_count, 0)
@@ -1,12 +1,58 @@
-from sqlalchemy import Boolean, CheckConstraint, DateTime, Float, ForeignKey, Integer, String, Text
-from sqlalchemy.orm import mapped_column, relationship
+from typing import Sequence
+
+from sqlalchemy import (
+    Boolean,
+    CheckConstraint,
+    ColumnElement,
+    ColumnExpressionArgument,
+    Computed,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    Row,
+    String,
+    Text,
+    and_,
+    exists,
+    func,
+    literal,
+    or_,
+    select,
+)
+from sqlalchemy.dialects.postgresql import REAL, REGCONFIG, TSQUERY, TSVECTOR
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import deferred, mapped_column, relationship
 
 from app.database.base import Base
+from app.models.category import Category
+from app.models.channel import Channel
+from app.models.channel_member import ChannelMember, Permission
 from app.models.secondary_tables import meeting_category, meeting_member
 
+# Конфигурации полнотекстового поиска: название и описание индексируются на обоих языках
+SEARCH_CONFIGS = ("russian", "english")
+
+
+def _search_vector_expression() -> str:
+    parts = [
+        f"setweight(to_tsvector('{config}', coalesce({column}, '')), '{weight}')"
+        for column, weight in (("title", "A"), ("description", "B"))
+        for config in SEARCH_CONFIGS
+    ]
+    return " || ".join(parts)
+
 
 class Meeting(Base):
     __tablename__ = "meeting"
+    __table_args__ = (
+        Index("ix_meeting_search_vector", "search_vector", postgresql_using="gin"),
+        # Поиск и списки по умолчанию: будущие мероприятия по дате начала
+        Index("ix_meeting_start_datetime", "start_datetime", "meeting_id"),
+        Index("ix_meeting_channel_id_start_datetime", "channel_id", "start_datetime"),
+        Index("ix_meeting_free_start_datetime", "start_datetime", "meeting_id", postgresql_where="price = 0"),
+    )
     id = mapped_column("meeting_id", Integer, primary_key=True)
     channel_id = mapped_column(Integer, ForeignKey("channel.channel_id"), nullable=False)
     title = mapped_column(String(256), nullable=False)
@@ -20,9 +66,78 @@ class Meeting(Base):
     maximum_age = mapped_column(Integer, CheckConstraint("maximum_age >= 0"), default=150)
     only_for_itmo_students = mapped_column(Boolean, nullable=False, default=False)
     only_for_russians = mapped_column(Boolean, nullable=False, default=False)
+    # rating = rating_sum / rating_count, все три поля изменяются только триггерами отзывов
     rating = mapped_column(Float, default=None)
+    rating_sum = mapped_column(Integer, nullable=False, default=0)
+    rating_count = mapped_column(Integer, nullable=False, default=0)
+    # Занятые места, меняется только в MeetingMember.join / MeetingMember.leave
+    members_cnt = mapped_column(
+        Integer,
+        CheckConstraint("members_cnt >= 0", name="meeting_members_cnt_check"),
+        nullable=False,
+        default=0,
+    )
+    # Мероприятие разослано в ленты участников канала (см. MeetingFeed.fan_out)
+    is_fanned_out = mapped_column(Boolean, nullable=False, default=False)
+    # Заполняется БД, в ответы не попадает и без необходимости не загружается
+    search_vector = deferred(mapped_column(TSVECTOR, Computed(_search_vector_expression(), persisted=True)))
 
     channel = relationship("Channel", back_populates="meetings")
     members = relationship("User", secondary=meeting_member, back_populates="meetings")
     categories = relationship("Category", secondary=meeting_category, back_populates="meetings")
     feedbacks = relationship("Feedback", back_populates="meeting")
+
+    @classmethod
+    def visible_to(cls, user_id: int) -> ColumnElement[bool]:
+        """Условие видимости мероприятия для пользователя, те же правила, что и у
+        get_current_channel_member: участник канала с правом SEE_MEETINGS
+        или гость (нет записи участника) публичного канала.
+        Оба подзапроса идут по первичным ключам channel_member и channel.
+        """
+        is_member = ChannelMember.channel_id == cls.channel_id, ChannelMember.user_id == user_id
+        return or_(
+            exists().where(
+                *is_member,
+                ChannelMember.permissions.op("&")(Permission.SEE_MEETINGS) == Permission.SEE_MEETINGS,
+            ),
+            and_(
+                exists().where(Channel.id == cls.channel_id, Channel.is_public == True),  # noqa: E712
+                ~exists().where(*is_member),
+            ),
+        )
+
+    @classmethod
+    def get_search_query(cls, text: str) -> ColumnElement:
+        """tsquery из строки пользователя (синтаксис websearch: "фраза", or, -слово) на всех языках."""
+        queries = [
+            func.websearch_to_tsquery(literal(config, REGCONFIG), text, type_=TSQUERY)
+            for config in SEARCH_CONFIGS
+        ]
+        query = queries[0]
+        for other in queries[1:]:
+            query = query.op("||")(other)
+        return query
+
+    @classmethod
+    def matches(cls, query: ColumnElement) -> ColumnElement[bool]:
+        return cls.search_vector.op("@@")(query)
+
+    @classmethod
+    def get_search_rank(cls, query: ColumnElement) -> ColumnElement[float]:
+        return func.ts_rank(cls.search_vector, query, type_=REAL)
+
+    @classmethod
+    async def count_by_category(
+        cls, async_session: AsyncSession, *criterion: ColumnExpressionArgument[bool]
+    ) -> Sequence[Row]:
+        """Количество мероприятий, подходящих под criterion, в каждой категории (id, name, count)."""
+        count = func.count().label("count")
+        stmt = (
+            select(Category.id, Category.name, count)
+            .join(meeting_category, meeting_category.c.category_id == Category.id)
+            .join(cls, cls.id == meeting_category.c.meeting_id)
+            .filter(*criterion)
+            .group_by(Category.id)
+            .order_by(count.desc(), Category.id)
+        )
+        return (await async_session.execute(stmt)).all()
@@ -0,0 +1,11 @@
+from sqlalchemy import ForeignKey, Integer
+from sqlalchemy.orm import mapped_column
+
+from app.database.base import Base
+
+
+class MeetingCategory(Base):
+    __tablename__ = "meeting_category"
+    __table_args__ = {"extend_existing": True}
+    meeting_id = mapped_column(Integer, ForeignKey("meeting.meeting_id"), primary_key=True)
+    category_id = mapped_column(Integer, ForeignKey("category.category_id"), primary_key=True)
@@ -0,0 +1,170 @@
+from typing import Iterable
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, select, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import mapped_column
+
+from app import settings
+from app.database.base import Base, Page, commit_or_flush, decode_cursor, encode_cursor
+from app.models.channel import Channel
+from app.models.channel_member import ChannelMember, Permission
+from app.models.meeting import Meeting
+from app.utils.time import datetime_now
+
+_CAN_SEE_MEETINGS = ChannelMember.permissions.op("&")(Permission.SEE_MEETINGS) == Permission.SEE_MEETINGS
+
+
+class MeetingFeed(Base):
+    """Лента мероприятий пользователя из его каналов (fan-out on write).
+
+    Строки добавляются при создании мероприятия каждому участнику канала с правом SEE_MEETINGS.
+    В каналах больше SERVER_FEED_MAX_FAN_OUT участников строки не создаются (Meeting.is_fanned_out
+    ложно, у канала выставляется Channel.has_unfanned_meetings), такие мероприятия лента читает
+    из meeting только по этим каналам пользователя (fan-out on read).
+    """
+
+    __tablename__ = "meeting_feed"
+    __table_args__ = (Index("ix_meeting_feed_meeting_id", "meeting_id"),)
+
+    # Первичный ключ покрывает чтение ленты: диапазон по (user_id, start_datetime, meeting_id)
+    user_id = mapped_column(Integer, ForeignKey("person.user_id", ondelete="CASCADE"), primary_key=True)
+    start_datetime = mapped_column(DateTime(timezone=True), primary_key=True)
+    meeting_id = mapped_column(
+        Integer, ForeignKey("meeting.meeting_id", ondelete="CASCADE"), primary_key=True
+    )
+
+    @classmethod
+    async def fan_out(cls, async_session: AsyncSession, meeting_id: int) -> None:
+        """Добавляет мероприятие в ленты участников канала, если канал не слишком большой.
+        Один запрос: UPDATE отмечает мероприятие как разосланное, INSERT выбирает из его результата.
+        Иначе канал отмечается как содержащий неразосланные мероприятия.
+        """
+        fanned_out = (
+            update(Meeting)
+            .where(
+                Meeting.id == meeting_id,
+                select(Channel.members_cnt).where(Channel.id == Meeting.channel_id).scalar_subquery()
+                <= settings.server.feed_max_fan_out,
+            )
+            .values(is_fanned_out=True)
+            .returning(Meeting.id, Meeting.channel_id, Meeting.start_datetime)
+            .cte("fanned_out")
+        )
+        stmt = insert(cls).from_select(
+            ["user_id", "meeting_id", "start_datetime"],
+            select(ChannelMember.user_id, fanned_out.c.id, fanned_out.c.start_datetime)
+            .join(fanned_out, ChannelMember.channel_id == fanned_out.c.channel_id)
+            .where(_CAN_SEE_MEETINGS),
+        )
+        await async_session.execute(stmt)
+        # Отметка не снимается: мероприятие не рассылается, даже если канал потом уменьшится
+        unfanned_channel = (
+            update(Channel)
+            .where(
+                Channel.id
+                == select(Meeting.channel_id)
+                .where(Meeting.id == meeting_id, Meeting.is_fanned_out == False)  # noqa: E712
+                .scalar_subquery(),
+                Channel.has_unfanned_meetings == False,  # noqa: E712
+            )
+            .values(has_unfanned_meetings=True)
+            .execution_options(synchronize_session=False)
+        )
+        await async_session.execute(unfanned_channel)
+        await commit_or_flush(async_session)
+
+    @classmethod
+    async def reschedule(cls, async_session: AsyncSession, meeting_id: int, start_datetime) -> None:
+        stmt = (
+            update(cls)
+            .where(cls.meeting_id == meeting_id)
+            .values(start_datetime=start_datetime)
+            .execution_options(synchronize_session=False)
+        )
+        await async_session.execute(stmt)
+        await commit_or_flush(async_session)
+
+    @classmethod
+    async def add_channel_members(
+        cls, async_session: AsyncSession, channel_id: int, user_ids: Iterable[int]
+    ) -> None:
+        """Добавляет новым участникам канала будущие разосланные мероприятия канала."""
+        members = (
+            select(ChannelMember.user_id)
+            .where(
+                ChannelMember.channel_id == channel_id, ChannelMember.user_id.in_(user_ids), _CAN_SEE_MEETINGS
+            )
+            .cte("members")
+        )
+        stmt = (
+            insert(cls)
+            .from_select(
+                ["user_id", "meeting_id", "start_datetime"],
+                select(members.c.user_id, Meeting.id, Meeting.start_datetime)
+                .join(Meeting, Meeting.channel_id == channel_id)
+                .where(Meeting.is_fanned_out == True, Meeting.start_datetime > datetime_now()),  # noqa: E712
+            )
+            .on_conflict_do_nothing()
+        )
+        await async_session.execute(stmt)
+        await commit_or_flush(async_session)
+
+    @classmethod
+    async def remove_channel_members(
+        cls, async_session: AsyncSession, channel_id: int, user_ids: Iterable[int]
+    ) -> None:
+        stmt = cls.__table__.delete().where(
+            cls.user_id.in_(user_ids),
+            cls.meeting_id.in_(select(Meeting.id).where(Meeting.channel_id == channel_id)),
+        )
+        await async_session.execute(stmt)
+        await commit_or_flush(async_session)
+
+    @classmethod
+    async def get_page(
+        cls, async_session: AsyncSession, user_id: int, *, limit: int, cursor: str | None = None
+    ) -> Page:
+        """Страница будущих мероприятий ленты, отсортированных по (start_datetime, meeting_id).
+
+        Разосланные мероприятия читаются одним диапазоном первичного ключа meeting_feed,
+        остальные - по индексу (channel_id, start_datetime) только в каналах пользователя
+        с неразосланными мероприятиями, обычно таких нет.
+        """
+        keys = [cls.start_datetime, cls.meeting_id]
+        after = decode_cursor(cursor, keys) if cursor is not None else (datetime_now(), 0)
+        fanned_out = (
+            select(cls.start_datetime, cls.meeting_id)
+            .where(cls.user_id == user_id, tuple_(cls.start_datetime, cls.meeting_id) > tuple_(*after))
+            .order_by(cls.start_datetime, cls.meeting_id)
+            .limit(limit + 1)
+        )
+        unfanned_channel_ids = (
+            select(ChannelMember.channel_id)
+            .join(Channel, Channel.id == ChannelMember.channel_id)
+            .where(
+                ChannelMember.user_id == user_id,
+                _CAN_SEE_MEETINGS,
+                Channel.has_unfanned_meetings == True,  # noqa: E712
+            )
+        )
+        fanned_out_on_read = (
+            select(Meeting.start_datetime, Meeting.id.label("meeting_id"))
+            .where(
+                Meeting.channel_id.in_(unfanned_channel_ids),
+                Meeting.is_fanned_out == False,  # noqa: E712
+                tuple_(Meeting.start_datetime, Meeting.id) > tuple_(*after),
+            )
+            .order_by(Meeting.start_datetime, Meeting.id)
+            .limit(limit + 1)
+        )
+        feed = union_all(fanned_out, fanned_out_on_read).subquery("feed")
+        stmt = (
+            select(Meeting, feed.c.start_datetime, feed.c.meeting_id)
+            .join(feed, Meeting.id == feed.c.meeting_id)
+            .order_by(feed.c.start_datetime, feed.c.meeting_id)
+            .limit(limit + 1)
+        )
+        rows = (await async_session.execute(stmt)).all()
+        next_cursor = encode_cursor(rows[limit - 1][1:]) if len(rows) > limit else None
+        return Page([row[0] for row in rows[:limit]], next_cursor)
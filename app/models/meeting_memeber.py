@@ -1,7 +1,15 @@
-from sqlalchemy import DateTime, ForeignKey, Integer
+from typing import Iterable, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, ForeignKey, Integer, delete, exists, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import mapped_column, relationship
 
-from app.database.base import Base
+from app.database.base import Base, commit_or_flush
+from app.models.meeting import Meeting
+from app.models.meeting_waiter import MeetingWaiter
+from app.models.user import User
 from app.utils.time import datetime_now
 
 
@@ -14,3 +22,174 @@ class MeetingMember(Base):
 
     user = relationship("User")
     meeting = relationship("Meeting")
+
+    @classmethod
+    async def join(cls, async_session: AsyncSession, meeting_id: int, user_id: int) -> bool:
+        """Занимает место и добавляет участника одним запросом, False - свободных мест нет.
+        Если пользователь уже участник, возвращает HTTP 409 (Конфликт).
+
+        UPDATE блокирует строку мероприятия, поэтому параллельные вступления проверяют
+        members_cnt < capacity по очереди и мероприятие не переполняется. Если пользователь
+        уже участник, INSERT нарушает первичный ключ и весь запрос (вместе с UPDATE) отменяется.
+        """
+        seat = (
+            update(Meeting)
+            .where(Meeting.id == meeting_id, Meeting.members_cnt < Meeting.capacity)
+            .values(members_cnt=Meeting.members_cnt + 1)
+            .returning(Meeting.id)
+            .cte("seat")
+        )
+        # Занявший место пользователь больше не ожидает в очереди
+        left_queue = (
+            delete(MeetingWaiter)
+            .where(
+                MeetingWaiter.meeting_id == meeting_id,
+                MeetingWaiter.user_id == user_id,
+                exists(seat.select()),
+            )
+            .cte("left_queue")
+        )
+        version = (
+            update(User)
+            .where(User.id == user_id, exists(seat.select()))
+            .values(meetings_version=User.meetings_version + 1)
+            .cte("version")
+        )
+        stmt = (
+            insert(cls)
+            .from_select(
+                ["meeting_id", "user_id", "date_of_join"],
+                select(seat.c.id, literal(user_id), literal(datetime_now(), cls.date_of_join.type)),
+            )
+            .returning(cls.meeting_id)
+            .add_cte(left_queue, version)
+        )
+        already_member = HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="You are already meeting member"
+        )
+        try:
+            joined = (await async_session.execute(stmt)).first() is not None
+            await commit_or_flush(async_session)
+        except IntegrityError:
+            raise already_member
+        if not joined and await async_session.scalar(
+            select(exists().where(cls.meeting_id == meeting_id, cls.user_id == user_id))
+        ):
+            raise already_member
+        return joined
+
+    @classmethod
+    async def wait_for_seat(cls, async_session: AsyncSession, meeting_id: int, user_id: int) -> int | None:
+        """Добавляет пользователя в очередь мероприятия, в котором не нашлось места (см. join),
+        и возвращает его позицию. None - место освободилось и пользователь стал участником.
+
+        Место могло освободиться после неудачного join, а освободивший его leave не видит еще
+        не зафиксированного ожидающего. Поэтому строка мероприятия блокируется (leave и
+        promote_waiters изменяют ее же и ждут фиксации), и в той же транзакции после добавления
+        в очередь выполняется продвижение очереди.
+        """
+        lock = select(Meeting.id).where(Meeting.id == meeting_id).with_for_update(key_share=True)
+        await async_session.execute(lock)
+        await MeetingWaiter.enqueue(async_session, meeting_id, user_id)
+        promoted = await cls.promote_waiters(async_session, meeting_id)
+        await commit_or_flush(async_session)
+        if user_id in promoted:
+            return None
+        return await MeetingWaiter.get_position(async_session, meeting_id, user_id)
+
+    @classmethod
+    async def leave(cls, async_session: AsyncSession, meeting_id: int, user_ids: Iterable[int]) -> int:
+        """Удаляет участников и освобождает их места одним запросом, возвращает количество удаленных."""
+        removed = (
+            delete(cls)
+            .where(cls.meeting_id == meeting_id, cls.user_id.in_(user_ids))
+            .returning(cls.user_id)
+            .cte("removed")
+        )
+        removed_cnt = select(func.count()).select_from(removed).scalar_subquery()
+        version = (
+            update(User)
+            .where(User.id.in_(select(removed.c.user_id)))
+            .values(meetings_version=User.meetings_version + 1)
+            .cte("version")
+        )
+        stmt = (
+            update(Meeting)
+            .where(Meeting.id == meeting_id, exists(removed.select()))
+            .values(members_cnt=Meeting.members_cnt - removed_cnt)
+            .returning(removed_cnt)
+            .add_cte(version)
+            .execution_options(synchronize_session=False)
+        )
+        removed_count = (await async_session.execute(stmt)).scalar_one_or_none() or 0
+        if removed_count:
+            await cls.promote_waiters(async_session, meeting_id)
+        await commit_or_flush(async_session)
+        return removed_count
+
+    @classmethod
+    async def promote_waiters(cls, async_session: AsyncSession, meeting_id: int) -> Sequence[int]:
+        """Переводит первых ожидающих из очереди в участники на все свободные места одним запросом,
+        возвращает id добавленных пользователей.
+
+        Записи очереди выбираются с FOR UPDATE SKIP LOCKED: параллельные продвижения не ждут друг
+        друга и не забирают одного и того же ожидающего. Изменения фиксирует вызывающий код.
+        """
+        free_seats = (
+            select(func.greatest(Meeting.capacity - Meeting.members_cnt, 0))
+            .where(Meeting.id == meeting_id)
+            .scalar_subquery()
+        )
+        next_waiters = (
+            select(MeetingWaiter.id)
+            .where(MeetingWaiter.meeting_id == meeting_id)
+            .order_by(MeetingWaiter.id)
+            .limit(free_seats)
+            .with_for_update(skip_locked=True)
+            .cte("next_waiters")
+        )
+        promoted = (
+            delete(MeetingWaiter)
+            .where(MeetingWaiter.id.in_(select(next_waiters.c.id)))
+            .returning(MeetingWaiter.meeting_id, MeetingWaiter.user_id)
+            .cte("promoted")
+        )
+        seats = (
+            update(Meeting)
+            .where(Meeting.id == meeting_id)
+            .values(
+                members_cnt=Meeting.members_cnt + select(func.count()).select_from(promoted).scalar_subquery()
+            )
+            .cte("seats")
+        )
+        version = (
+            update(User)
+            .where(User.id.in_(select(promoted.c.user_id)))
+            .values(meetings_version=User.meetings_version + 1)
+            .cte("version")
+        )
+        stmt = (
+            insert(cls)
+            .from_select(
+                ["meeting_id", "user_id", "date_of_join"],
+                select(
+                    promoted.c.meeting_id, promoted.c.user_id, literal(datetime_now(), cls.date_of_join.type)
+                ),
+            )
+            .returning(cls.user_id)
+            .add_cte(seats, version)
+        )
+        return (await async_session.scalars(stmt)).all()
+
+    @classmethod
+    async def touch_members(cls, async_session: AsyncSession, meeting_id: int) -> None:
+        """Увеличивает User.meetings_version участников мероприятия (мероприятие изменено или удаляется).
+        Изменения фиксирует вызывающий код.
+        """
+        stmt = (
+            update(User)
+            .where(User.id.in_(select(cls.user_id).where(cls.meeting_id == meeting_id)))
+            .values(meetings_version=User.meetings_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        await async_session.execute(stmt)
@@ -0,0 +1,72 @@
+from typing import List, Sequence
+
+from sqlalchemy import ForeignKey, Index, Integer, SmallInteger, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY, REAL
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import mapped_column
+
+from app.database.base import Base, commit_or_flush
+from app.models.meeting import Meeting
+from app.utils.time import datetime_now
+
+
+class MeetingRecommendation(Base):
+    """Рекомендованные пользователю мероприятия, заполняется заданием app.jobs.recommendations."""
+
+    __tablename__ = "meeting_recommendation"
+    # Для каскадного удаления мероприятий
+    __table_args__ = (Index("ix_meeting_recommendation_meeting_id", "meeting_id"),)
+
+    # Первичный ключ - порядок выдачи: рекомендации пользователя читаются одним диапазоном
+    user_id = mapped_column(Integer, ForeignKey("person.user_id", ondelete="CASCADE"), primary_key=True)
+    position = mapped_column(SmallInteger, primary_key=True)
+    meeting_id = mapped_column(Integer, ForeignKey("meeting.meeting_id", ondelete="CASCADE"), nullable=False)
+    score = mapped_column(REAL, nullable=False)
+
+    @classmethod
+    async def get_meetings(cls, async_session: AsyncSession, user_id: int) -> List[Meeting]:
+        """Рекомендованные мероприятия, которые еще не начались и по-прежнему видны пользователю."""
+        stmt = (
+            select(Meeting)
+            .join(cls, cls.meeting_id == Meeting.id)
+            .where(
+                cls.user_id == user_id, Meeting.start_datetime > datetime_now(), Meeting.visible_to(user_id)
+            )
+            .order_by(cls.position)
+        )
+        return list((await async_session.scalars(stmt)).all())
+
+    @classmethod
+    async def replace_range(
+        cls,
+        async_session: AsyncSession,
+        after_user_id: int,
+        last_user_id: int,
+        user_ids: Sequence[int],
+        positions: Sequence[int],
+        meeting_ids: Sequence[int],
+        scores: Sequence[float],
+    ) -> None:
+        """Заменяет рекомендации пользователей с user_id в (after_user_id, last_user_id].
+        Новые строки передаются массивами и вставляются одним INSERT ... SELECT FROM unnest(...).
+        """
+        await async_session.execute(
+            cls.__table__.delete().where(cls.user_id > after_user_id, cls.user_id <= last_user_id)
+        )
+        rows = (
+            func.unnest(
+                bindparam("user_ids", list(user_ids), type_=ARRAY(Integer)),
+                bindparam("positions", list(positions), type_=ARRAY(SmallInteger)),
+                bindparam("meeting_ids", list(meeting_ids), type_=ARRAY(Integer)),
+                bindparam("scores", list(scores), type_=ARRAY(REAL)),
+            )
+            .table_valued("user_id", "position", "meeting_id", "score")
+            .render_derived()
+        )
+        await async_session.execute(
+            cls.__table__.insert().from_select(
+                ["user_id", "position", "meeting_id", "score"],
+                select(rows.c.user_id, rows.c.position, rows.c.meeting_id, rows.c.score),
+            )
+        )
+        await commit_or_flush(async_session)
@@ -0,0 +1,51 @@
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, Integer, UniqueConstraint, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import mapped_column
+
+from app.database.base import Base
+from app.utils.time import utc_now
+
+
+class MeetingWaiter(Base):
+    """Пользователь в листе ожидания мероприятия без свободных мест.
+    Очередь упорядочена по id: освободившееся место получает ожидающий с наименьшим id
+    (см. MeetingMember.promote_waiters)."""
+
+    __tablename__ = "meeting_waiter"
+    __table_args__ = (
+        UniqueConstraint("meeting_id", "user_id"),
+        Index("ix_meeting_waiter_meeting_id", "meeting_id", "waiter_id"),
+    )
+
+    id = mapped_column("waiter_id", BigInteger, primary_key=True)
+    meeting_id = mapped_column(Integer, ForeignKey("meeting.meeting_id", ondelete="CASCADE"), nullable=False)
+    user_id = mapped_column(Integer, ForeignKey("person.user_id", ondelete="CASCADE"), nullable=False)
+    created_at = mapped_column(DateTime(timezone=True), nullable=False, default=utc_now)
+
+    @classmethod
+    async def enqueue(cls, async_session: AsyncSession, meeting_id: int, user_id: int) -> None:
+        """Добавляет пользователя в конец очереди, если его там еще нет.
+        Изменения фиксирует вызывающий код (см. MeetingMember.wait_for_seat).
+        """
+        stmt = (
+            insert(cls)
+            .values(meeting_id=meeting_id, user_id=user_id, created_at=utc_now())
+            .on_conflict_do_nothing(index_elements=["meeting_id", "user_id"])
+        )
+        await async_session.execute(stmt)
+
+    @classmethod
+    async def get_position(cls, async_session: AsyncSession, meeting_id: int, user_id: int) -> int | None:
+        """Позиция в очереди начиная с 1, None - пользователь не ожидает.
+
+        Считает записи очереди до пользователя по диапазону индекса (meeting_id, waiter_id),
+        поэтому стоимость растет с позицией: O(n), где n - позиция в очереди. Строки таблицы
+        не читаются, только если Postgres выберет index-only scan (карта видимости актуальна).
+        """
+        waiter_id = (
+            select(cls.id).where(cls.meeting_id == meeting_id, cls.user_id == user_id).scalar_subquery()
+        )
+        stmt = select(func.count()).where(cls.meeting_id == meeting_id, cls.id <= waiter_id)
+        position = await async_session.scalar(stmt)
+        return position or None
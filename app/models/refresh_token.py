@@ -1,12 +1,26 @@
 import uuid
 from datetime import datetime
+from typing import Optional, Self
 
-from sqlalchemy import DateTime, ForeignKey, Uuid, update
+from sqlalchemy import (
+    DateTime,
+    ForeignKey,
+    Index,
+    Uuid,
+    delete,
+    insert,
+    literal,
+    select,
+    true,
+    tuple_,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app import settings
 from app.database import Base
+from app.database.base import commit_or_flush
 from app.utils.time import add_delta_to_current_utc, utc_now
 
 
@@ -15,19 +29,92 @@ def _expires_at() -> datetime:
 
 
 class RefreshToken(Base):
+    """Токен обновления.
+
+    Таблица секционирована по expires_at (по месяцам), поэтому expires_at входит в первичный ключ.
+    Секции, в которых все токены истекли, удаляются целиком (см. app.jobs.refresh_tokens).
+    """
+
     __tablename__ = "refresh_token"
+    __table_args__ = (
+        Index("ix_refresh_token_user_id_active", "user_id", postgresql_where="is_active"),
+        {"postgresql_partition_by": "RANGE (expires_at)"},
+    )
 
     id: Mapped[str] = mapped_column(
         Uuid(as_uuid=False), primary_key=True, index=True, default=lambda: str(uuid.uuid4())
     )
     issues_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utc_now)
-    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=_expires_at)
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, nullable=False, default=_expires_at
+    )
     is_active: Mapped[bool] = mapped_column(nullable=False, default=True)
     is_staff: Mapped[bool] = mapped_column(nullable=False)
     user_id: Mapped[int] = mapped_column(ForeignKey("person.user_id"), nullable=False)
 
     @classmethod
     async def revoke_all(cls, db_session: AsyncSession, user_id: int) -> None:
-        stmt = update(cls).where(cls.user_id == user_id).values(is_active=False)
+        # Условие на expires_at отсекает секции с истекшими токенами
+        stmt = (
+            update(cls)
+            .where(cls.user_id == user_id, cls.is_active == True, cls.expires_at > utc_now())  # noqa: E712
+            .values(is_active=False)
+        )
         await db_session.execute(stmt)
+        await commit_or_flush(db_session)
+
+    @classmethod
+    async def purge(cls, db_session: AsyncSession, batch_size: int) -> int:
+        """Удаляет не более batch_size истекших или деактивированных токенов, возвращает их количество."""
+        batch = (
+            select(cls.id, cls.expires_at)
+            .where((cls.expires_at <= utc_now()) | (cls.is_active == False))  # noqa: E712
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            delete(cls)
+            .where(tuple_(cls.id, cls.expires_at).in_(batch))
+            .execution_options(synchronize_session=False)
+        )
+        result = await db_session.execute(stmt)
         await db_session.commit()
+        return result.rowcount
+
+    @classmethod
+    async def rotate(cls, db_session: AsyncSession, token_id: str) -> Optional[Self]:
+        """Деактивирует действующий токен и выпускает вместо него новый одним запросом.
+
+        Если токен уже деактивирован, истек или не существует, возвращает None.
+        Конкурентные обновления одного токена не пройдут: UPDATE с условием is_active
+        сработает только в одной транзакции.
+        """
+        old_token = (
+            update(cls)
+            .where(cls.id == token_id, cls.is_active == True, cls.expires_at > utc_now())  # noqa: E712
+            .values(is_active=False)
+            .returning(cls.user_id, cls.is_staff)
+            .cte("old_token")
+        )
+        new_token = cls(id=str(uuid.uuid4()), issues_at=utc_now(), expires_at=_expires_at(), is_active=True)
+        stmt = (
+            insert(cls)
+            .from_select(
+                ["id", "issues_at", "expires_at", "is_active", "user_id", "is_staff"],
+                select(
+                    literal(new_token.id, cls.id.type),
+                    literal(new_token.issues_at, cls.issues_at.type),
+                    literal(new_token.expires_at, cls.expires_at.type),
+                    true(),
+                    old_token.c.user_id,
+                    old_token.c.is_staff,
+                ),
+            )
+            .returning(cls.user_id, cls.is_staff)
+        )
+        row = (await db_session.execute(stmt)).one_or_none()
+        await commit_or_flush(db_session)
+        if row is None:
+            return None
+        new_token.user_id, new_token.is_staff = row.user_id, row.is_staff
+        return new_token
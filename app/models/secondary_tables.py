@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Table
+from sqlalchemy import Column, ForeignKey, Index, Table
 
 from app.database import Base
 
@@ -7,6 +7,8 @@ meeting_category = Table(
     Base.metadata,
     Column("meeting_id", ForeignKey("meeting.meeting_id"), primary_key=True),
     Column("category_id", ForeignKey("category.category_id"), primary_key=True),
+    # Фильтр и фасеты поиска мероприятий по категориям
+    Index("ix_meeting_category_category_id", "category_id", "meeting_id"),
 )
 
 meeting_member = Table(
@@ -14,6 +16,8 @@ meeting_member = Table(
     Base.metadata,
     Column("meeting_id", ForeignKey("meeting.meeting_id"), primary_key=True),
     Column("user_id", ForeignKey("person.user_id"), primary_key=True),
+    # Мероприятия пользователя
+    Index("ix_meeting_member_user_id", "user_id", "meeting_id"),
 )
 
 favorite_category = Table(
@@ -1,9 +1,9 @@
-from sqlalchemy import Connection, event, insert, text, update
+from sqlalchemy import Connection, event, insert, inspect, select, text, update
 from sqlalchemy.orm import Mapper
 
 from app.models.channel import Channel
 from app.models.channel_member import ChannelMember
-from app.models.feedback import Feedback
+from app.models.feedback import Feedback, average_rating
 from app.models.meeting import Meeting
 from app.models.user import User
 
@@ -33,15 +33,65 @@ def create_personal_channel_trigger(mapper: Mapper[User], connection: Connection
     connection.execute(stmt)
 
 
+def _add_rates(connection: Connection, meeting_id: int, rate_delta: int, count_delta: int) -> None:
+    """Изменяет сумму и количество оценок мероприятия и его канала на разницу одним запросом,
+    не перечитывая отзывы.
+    """
+    rated_meeting = (
+        update(Meeting)
+        .where(Meeting.id == meeting_id)
+        .values(
+            rating_sum=Meeting.rating_sum + rate_delta,
+            rating_count=Meeting.rating_count + count_delta,
+            rating=average_rating(Meeting.rating_sum + rate_delta, Meeting.rating_count + count_delta),
+        )
+        .returning(Meeting.channel_id)
+        .cte("rated_meeting")
+    )
+    stmt = (
+        update(Channel)
+        .where(Channel.id.in_(select(rated_meeting.c.channel_id)))
+        .values(
+            rating_sum=Channel.rating_sum + rate_delta,
+            rating_count=Channel.rating_count + count_delta,
+            rating=average_rating(Channel.rating_sum + rate_delta, Channel.rating_count + count_delta),
+        )
+    )
+    connection.execute(stmt)
+
+
 @event.listens_for(Feedback, "after_insert")
+def add_meeting_rate_trigger(mapper: Mapper[Feedback], connection: Connection, target: Feedback):
+    _add_rates(connection, target.meeting_id, target.rate, 1)
+
+
 @event.listens_for(Feedback, "after_update")
+def change_meeting_rate_trigger(mapper: Mapper[Feedback], connection: Connection, target: Feedback):
+    old_rates = inspect(target).attrs.rate.history.deleted
+    if old_rates:
+        _add_rates(connection, target.meeting_id, target.rate - old_rates[0], 0)
+
+
 @event.listens_for(Feedback, "after_delete")
-def update_meeting_rating_trigger(mapper: Mapper[Feedback], connection: Connection, target: Feedback):
-    avg_stmt = text("select avg(rate) from feedback where meeting_id = :meeting_id").params(
-        meeting_id=target.meeting_id
+def remove_meeting_rate_trigger(mapper: Mapper[Feedback], connection: Connection, target: Feedback):
+    _add_rates(connection, target.meeting_id, -target.rate, -1)
+
+
+@event.listens_for(Meeting, "after_delete")
+def remove_channel_rates_trigger(mapper: Mapper[Meeting], connection: Connection, target: Meeting):
+    if not target.rating_count:
+        return
+    stmt = (
+        update(Channel)
+        .where(Channel.id == target.channel_id)
+        .values(
+            rating_sum=Channel.rating_sum - target.rating_sum,
+            rating_count=Channel.rating_count - target.rating_count,
+            rating=average_rating(
+                Channel.rating_sum - target.rating_sum, Channel.rating_count - target.rating_count
+            ),
+        )
     )
-    avg = connection.execute(avg_stmt).scalar_one()
-    stmt = update(Meeting).where(Meeting.id == target.meeting_id).values(rating=avg)
     connection.execute(stmt)
 
 
@@ -1,16 +1,16 @@
 import enum
 from functools import cache
-from typing import Optional, Set
+from typing import Literal, Mapping, Optional, Set
 
 from sqlalchemy import Boolean, Date
 from sqlalchemy import Enum as SQLEnum
-from sqlalchemy import ForeignKey, Integer, String
+from sqlalchemy import ForeignKey, Integer, String, select, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import mapped_column, relationship
-from werkzeug.security import check_password_hash, generate_password_hash
 
 from app.database import Base
 from app.models.secondary_tables import favorite_category, meeting_member
+from app.utils.password import password_hasher
 
 
 class Gender(enum.Enum):
@@ -35,6 +35,9 @@ DEFAULT_CONFIDENTIALITY = (
     Confidentiality.HIDE_PATRONYMIC | Confidentiality.HIDE_TELEPHONE | Confidentiality.HIDE_EMAIL
 )
 
+# Поля, по которым пользователь может войти (см. User.get_by_login)
+LoginField = Literal["username", "telephone", "email"]
+
 
 class User(Base):
     __tablename__ = "person"
@@ -61,6 +64,9 @@ class User(Base):
     confidentiality = mapped_column(Integer, nullable=False, default=DEFAULT_CONFIDENTIALITY)
     is_staff = mapped_column(Boolean, nullable=False, default=False)
     is_active = mapped_column(Boolean, nullable=False, default=True)
+    # Увеличивается при любом изменении мероприятий пользователя (вступление, выход,
+    # изменение или удаление мероприятия), служит ETag календаря мероприятий
+    meetings_version = mapped_column(Integer, nullable=False, default=0)
 
     favorites_categories = relationship("Category", secondary=favorite_category)
     channel_members = relationship("ChannelMember", back_populates="user")
@@ -73,12 +79,14 @@ class User(Base):
 
     @password.setter
     def password(self, plain_password):
-        self.password_hash = generate_password_hash(
-            plain_password, method="pbkdf2:sha512:600000", salt_length=32
-        )
+        # PBKDF2 заблокировал бы event loop, пароль хешируется в пуле процессов через set_password
+        raise AttributeError("password is not writable attribute, use await set_password().")
+
+    async def set_password(self, plain_password: str) -> None:
+        self.password_hash = await password_hasher.hash_password(plain_password)
 
-    def verify_password(self, plain_password):
-        return check_password_hash(self.password_hash, plain_password)
+    async def verify_password(self, plain_password: str) -> bool:
+        return await password_hasher.verify_password(self.password_hash, plain_password)
 
     @staticmethod
     @cache
@@ -108,7 +116,20 @@ class User(Base):
         return self._get_private_field_names(self.confidentiality)
 
     @classmethod
-    async def get_by_login(cls, db_session: AsyncSession, login: str) -> Optional["User"]:
-        return await cls.get_first_by_filter(
-            db_session, (cls.username == login) | (cls.telephone == login) | (cls.email == login)
+    async def get_by_login(
+        cls, db_session: AsyncSession, logins: Mapping[LoginField, str]
+    ) -> Optional["User"]:
+        """Ищет пользователя по значениям логина в полях username, telephone и email
+        (см. app.schemas.user.parse_login).
+
+        Если поле одно, запрос использует один уникальный индекс, иначе - UNION ALL поисков
+        по индексам полей.
+        """
+        criteria = [getattr(cls, field) == login for field, login in logins.items()]
+        if len(criteria) == 1:
+            return await cls.get_first_by_filter(db_session, criteria[0])
+        stmt = select(cls).from_statement(
+            union_all(*(select(cls).where(criterion) for criterion in criteria)).limit(1)
         )
+        result = await db_session.execute(stmt)
+        return result.scalars().first()
@@ -1,13 +1,16 @@
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from app.models import RefreshToken
+from app.database.base import commit_or_flush
+from app.models import Channel, MeetingFeed, RefreshToken
 from app.models.channel_member import ChannelMember, Role
 from app.models.user import User
+from app.utils.channel_access import invalidate_channel, invalidate_channel_member
 
 
 async def delete_owner(db_session: AsyncSession, old_owner: ChannelMember):
     channel = old_owner.channel
-    members = channel.members
+    members = await channel.awaitable_attrs.members
     if len(members) > 1:  # Если у кана есть другие участники, то права владельца передаются
         members: list = members.copy()
         members.remove(old_owner)
@@ -16,24 +19,31 @@ async def delete_owner(db_session: AsyncSession, old_owner: ChannelMember):
         new_owner.is_owner = True
         db_session.add(new_owner)
         await db_session.delete(old_owner)
+        invalidate_channel_member(db_session, channel.id, new_owner.user_id)
     else:  # Иначе канал деактивируется
         channel.is_active = False
         db_session.add(channel)
-    await db_session.commit()
+        invalidate_channel(db_session, channel.id)
+    invalidate_channel_member(db_session, channel.id, old_owner.user_id)
+    await MeetingFeed.remove_channel_members(db_session, channel.id, [old_owner.user_id])
+    await commit_or_flush(db_session)
 
 
 async def deactivate_user(db_session: AsyncSession, user: User):
     # Находим информацию о сообществах, где владелец деактивируемый пользователь.
     owner_members = await ChannelMember.filter(
-        db_session, (ChannelMember.user_id == user.id) & (ChannelMember.is_owner == True)  # noqa: E712
+        db_session,
+        (ChannelMember.user_id == user.id) & (ChannelMember.is_owner == True),  # noqa: E712
+        options=[joinedload(ChannelMember.channel).selectinload(Channel.members)],
     )
     for owner_member in owner_members:
         channel = owner_member.channel
         if channel.is_personal:  # Личные каналы деактивируем
             channel.is_active = False
             db_session.add(channel)
+            invalidate_channel(db_session, channel.id)
         else:
-            members = channel.members.copy()
+            members = (await channel.awaitable_attrs.members).copy()
             if len(members) > 1:  # Если у кана есть другие участники, то права владельца передаются
                 members: list = members.copy()
                 members.remove(owner_member)
@@ -44,11 +54,13 @@ async def deactivate_user(db_session: AsyncSession, user: User):
                 owner_member.permissions = Role.ADMIN
                 db_session.add(new_owner)
                 db_session.add(owner_member)
+                invalidate_channel_member(db_session, channel.id, new_owner.user_id)
+                invalidate_channel_member(db_session, channel.id, owner_member.user_id)
             else:  # Иначе канал деактивируется
                 channel.is_active = False
                 db_session.add(channel)
+                invalidate_channel(db_session, channel.id)
     user.is_active = False
     db_session.add(user)
-    await db_session.commit()
-    await db_session.refresh(user)
+    await commit_or_flush(db_session)
     await RefreshToken.revoke_all(db_session, user.id)
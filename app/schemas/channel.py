@@ -22,7 +22,7 @@ class RecoveryChannel(BaseModel):
 class ReadChannel(ChannelBase):
     id: int
     members_cnt: int = 0
-    rating: int | None = None
+    rating: float | None = None
     is_personal: bool = False
     is_public: bool = False
     is_active: bool = True
@@ -1,7 +1,9 @@
 from datetime import datetime
-from typing import Literal
+from typing import Literal, Set
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from app import settings
 
 
 class ChannelMember(BaseModel):
@@ -24,3 +26,7 @@ class ReadChannelMember(ChannelMember):
     is_owner: bool
 
     date_of_join: datetime
+
+
+class ConfirmChannelMembers(BaseModel):
+    user_ids: Set[int] = Field(min_length=1, max_length=settings.server.max_batch_size)
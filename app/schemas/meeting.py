@@ -1,8 +1,10 @@
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, List, Set
 
 from pydantic import AfterValidator, BaseModel, Field
 
+from app import settings
+from app.schemas.page import Page
 from app.schemas.validators import date_time_to_server_tz, datetime_more_then_now
 
 
@@ -39,3 +41,26 @@ class ReadMeeting(MeetingBase):
     channel_id: int
     start_datetime: datetime
     rating: float | None = None
+    members_cnt: int = Field(default=0, description="Количество участников (занятых мест).")
+
+
+class AddMeetingCategories(BaseModel):
+    category_ids: Set[int] = Field(min_length=1, max_length=settings.server.max_batch_size)
+
+
+class CategoryFacet(BaseModel):
+    id: int
+    name: str
+    count: int = Field(description="Количество найденных мероприятий в категории.")
+
+
+class MeetingSearchPage(Page[ReadMeeting]):
+    facets: List[CategoryFacet] | None = Field(
+        default=None,
+        description="Количество найденных мероприятий по категориям без учета фильтра по категориям. "
+        "Возвращается только для первой страницы.",
+    )
+
+
+class WaitlistPosition(BaseModel):
+    position: int = Field(description="Позиция в листе ожидания, начиная с 1.")
@@ -0,0 +1,12 @@
+from typing import Generic, List, TypeVar
+
+from pydantic import BaseModel, Field
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: str | None = Field(
+        default=None, description="Курсор следующей страницы, null - если это последняя страница."
+    )
@@ -1,13 +1,15 @@
+import re
 from datetime import date
-from typing import Annotated
+from typing import Annotated, Dict
 
-from pydantic import AfterValidator, BaseModel, EmailStr, Field
+from pydantic import AfterValidator, BaseModel, EmailStr, Field, TypeAdapter, ValidationError
 from pydantic_extra_types.phone_numbers import PhoneNumber
 
-from app.models.user import DEFAULT_CONFIDENTIALITY, Gender, User
+from app.models.user import DEFAULT_CONFIDENTIALITY, Gender, LoginField, User
 from app.schemas.validators import age_validator
 
 MIN_USER_AGE = 16
+USERNAME_PATTERN = r"^\w+$"
 
 
 class UserPhoneNumber(PhoneNumber):
@@ -16,7 +18,7 @@ class UserPhoneNumber(PhoneNumber):
 
 class UserBase(BaseModel):
     username: str | None = Field(
-        default=None, min_length=3, max_length=20, pattern=r"^\w+$", examples=["elison98"]
+        default=None, min_length=3, max_length=20, pattern=USERNAME_PATTERN, examples=["elison98"]
     )
     telephone: UserPhoneNumber = Field(examples=["+79001234567"])
     email: EmailStr = Field(max_length=320, examples=["elison@example.com"])
@@ -83,3 +85,39 @@ class ReadOpenUserInfo(BaseModel):
 
 def get_open_user_info(user: User) -> dict:
     return user.convert_to(ReadOpenUserInfo).model_dump(exclude=user.get_private_field_names())
+
+
+_email_adapter = TypeAdapter(EmailStr)
+_telephone_adapter = TypeAdapter(UserPhoneNumber)
+
+
+def parse_login(login: str) -> Dict[LoginField, str]:
+    """Определяет, чем может быть логин, и приводит его к виду, в котором он хранится в бд.
+
+    Возвращает значения логина по полям пользователя. Строка из цифр может быть и именем
+    пользователя, и номером телефона без "+", тогда возвращаются оба варианта. Если тип логина
+    определить не удалось, логин без изменений ищется по всем полям.
+    """
+    unknown: Dict[LoginField, str] = {"username": login, "telephone": login, "email": login}
+    if "@" in login:
+        try:
+            return {"email": _email_adapter.validate_python(login)}
+        except ValidationError:
+            return unknown
+    if login.isdigit():
+        logins: Dict[LoginField, str] = {"username": login}
+        try:
+            logins["telephone"] = _telephone_adapter.validate_python(f"+{login}")
+        except ValidationError:
+            pass
+        return logins
+    if re.fullmatch(USERNAME_PATTERN, login):
+        return {"username": login}
+    try:
+        return {"telephone": _telephone_adapter.validate_python(login)}
+    except ValidationError:
+        return unknown
+
+
+class CalendarUrl(BaseModel):
+    url: str
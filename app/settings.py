@@ -1,7 +1,7 @@
 import secrets
 from typing import List, Literal
 
-from pydantic import AnyHttpUrl, EmailStr, PositiveInt
+from pydantic import AnyHttpUrl, EmailStr, NonNegativeInt, PositiveFloat, PositiveInt
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from sqlalchemy import URL
 
@@ -16,6 +16,14 @@ class ServerSettings(BaseSettings):
     port: PositiveInt = 8000
     path_prefix: str = ""
     timezone: str = "UTC"
+    # Режим разработки: статистика запросов к БД в заголовках ответа
+    debug: bool = False
+    default_page_size: PositiveInt = 20
+    max_page_size: PositiveInt = 100
+    max_batch_size: PositiveInt = 1000
+    # Мероприятия каналов с большим числом участников не рассылаются по лентам,
+    # а читаются лентой из meeting при запросе
+    feed_max_fan_out: PositiveInt = 1000
 
 
 class AuthSettings(BaseSettings):
@@ -23,6 +31,23 @@ class AuthSettings(BaseSettings):
     jwt_algorithm: str = "HS256"
     access_token_lifetime_in_min: int = 5
     refresh_token_lifetime_in_min: int = 30 * 24 * 60
+    access_token_cache_size: int = 4096
+    # Права пользователей в каналах кешируются в каждом воркере, изменения в других воркерах
+    # становятся видны не позже чем через channel_access_cache_ttl_in_sec
+    channel_access_cache_size: int = 10_000
+    channel_access_cache_ttl_in_sec: PositiveInt = 30
+    login_attempts_per_min_by_login: PositiveInt = 5
+    login_attempts_per_min_by_ip: PositiveInt = 50
+    login_throttle_cache_size: PositiveInt = 100_000
+
+
+class PasswordHashSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="password_hash_", extra="allow")
+
+    method: str = "pbkdf2:sha512:600000"
+    salt_length: PositiveInt = 32
+    # None - по количеству ядер процессора
+    max_workers: PositiveInt | None = None
 
 
 class PostgresSettings(BaseSettings):
@@ -34,13 +59,30 @@ class PostgresSettings(BaseSettings):
     port: PositiveInt = 5432
     db: str
 
-    def get_url(self, driver: Literal["asyncpg", "psycopg2"] = "asyncpg"):
+    # Пул соединений каждого процесса (uvicorn воркера): до pool_size + max_overflow соединений
+    pool_size: PositiveInt = 5
+    max_overflow: NonNegativeInt = 10
+    pool_timeout_in_sec: PositiveFloat = 30
+    # -1 - не пересоздавать соединения по возрасту
+    pool_recycle_in_sec: int = 1800
+    pool_pre_ping: bool = True
+    # 0 - отключить кеш подготовленных запросов asyncpg (нужно за pgbouncer в режиме transaction,
+    # имена запросов уникальны, см. app.database.core)
+    prepared_statement_cache_size: NonNegativeInt = 100
+
+    # Реплика для читающих запросов. Если не указана, все запросы идут в основную БД
+    replica_host: str | None = None
+    replica_port: PositiveInt | None = None
+    # Сколько секунд после изменения данных клиент читает из основной БД (задержка репликации)
+    read_your_writes_in_sec: PositiveInt = 5
+
+    def get_url(self, driver: Literal["asyncpg", "psycopg2"] = "asyncpg", replica: bool = False):
         return URL(
             drivername=f"postgresql+{driver}",
             username=self.user,
             password=self.password,
-            host=self.host,
-            port=self.port,
+            host=self.replica_host if replica else self.host,
+            port=(self.replica_port or self.port) if replica else self.port,
             database=self.db,
             query="",
         ).render_as_string(hide_password=False)
@@ -53,6 +95,42 @@ class EmailSettings(BaseSettings):
     password: str
     smtp_host: str = "smtp.gmail.com"
     ssl_port: int = 465
+    # Без SSL (например, локальный отладочный SMTP сервер) используется smtp_port
+    use_ssl: bool = True
+    smtp_port: int = 25
+
+    outbox_batch_size: PositiveInt = 50
+    outbox_poll_interval_in_sec: float = 5
+    outbox_max_attempts: PositiveInt = 8
+    outbox_retry_delay_in_sec: float = 30
+    # Время, на которое обработчик закрепляет пачку писем, должно превышать время ее отправки
+    outbox_lease_in_sec: PositiveInt = 300
+
+
+class JobsSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="jobs_", extra="allow")
+
+    refresh_token_purge_batch_size: PositiveInt = 5000
+    refresh_token_purge_pause_in_sec: float = 0.1
+    refresh_token_partitions_ahead: PositiveInt = 2
+    # Рекомендации мероприятий (app.jobs.recommendations)
+    recommendations_per_user: PositiveInt = 20
+    # Сколько пользователей оценивается за раз: память на пачку ~ chunk_size * число мероприятий * 4 байта
+    recommendation_chunk_size: PositiveInt = 2000
+    recommendation_channel_weight: float = 0.5
+    recommendation_rating_weight: float = 0.2
+    # Сверка сумм оценок мероприятий и каналов (app.jobs.ratings)
+    rating_repair_batch_size: PositiveInt = 10000
+
+
+class SlowQuerySettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="slow_query_", extra="allow")
+
+    # None - журнал медленных запросов отключен
+    threshold_in_ms: PositiveInt | None = None
+    # Сколько медленных SELECT в минуту переисполнять с EXPLAIN (ANALYZE, BUFFERS)
+    explain_per_min: NonNegativeInt = 6
+    queue_size: PositiveInt = 1000
 
 
 class UtilsSettings(BaseSettings):
@@ -63,6 +141,9 @@ class UtilsSettings(BaseSettings):
 
 server = ServerSettings()
 auth = AuthSettings()
+password_hash = PasswordHashSettings()
 postgres = PostgresSettings()
 email = EmailSettings()
 utils = UtilsSettings()
+jobs = JobsSettings()
+slow_query = SlowQuerySettings()
@@ -0,0 +1,109 @@
+"""Кеш прав пользователей в каналах.
+
+Для проверки прав в обработчиках каналов и мероприятий нужна только маска прав участника
+и публичность канала, поэтому они кешируются в памяти воркера на AUTH_CHANNEL_ACCESS_CACHE_TTL_IN_SEC.
+Код, изменяющий участников или канал, вызывает invalidate_channel_member / invalidate_channel:
+запись удаляется сразу и еще раз после фиксации транзакции, чтобы не остались прочитанные
+до фиксации права. Кеш заполняется только из основной БД: права, прочитанные с отстающей
+реплики после сброса, остались бы в кеше на весь TTL.
+"""
+
+import time
+from typing import List, NamedTuple, Tuple
+
+from sqlalchemy import and_, event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import settings
+from app.database.core import async_replica_engine, make_async_session
+from app.models import Channel, ChannelMember
+from app.utils.cache import ExpiringLRUCache
+
+_PENDING_INVALIDATIONS = "channel_access_invalidations"
+
+
+class MemberAccess(NamedTuple):
+    # None - пользователь не участник канала
+    permissions: int | None
+    is_owner: bool
+
+
+class ChannelFlags(NamedTuple):
+    is_public: bool
+    is_personal: bool
+    is_active: bool
+
+
+# (user_id, channel_id) -> права участника
+member_access_cache: ExpiringLRUCache[Tuple[int, int], MemberAccess] = ExpiringLRUCache(
+    settings.auth.channel_access_cache_size
+)
+# channel_id -> признаки канала
+channel_flags_cache: ExpiringLRUCache[int, ChannelFlags] = ExpiringLRUCache(
+    settings.auth.channel_access_cache_size
+)
+
+
+async def get_channel_access(
+    db_session: AsyncSession, user_id: int, channel_id: int
+) -> Tuple[MemberAccess, ChannelFlags] | None:
+    """Права пользователя и признаки канала, None если канала не существует.
+    При промахе кеша выполняется один запрос, для сессии реплики - в основную БД.
+    """
+    member = member_access_cache.get((user_id, channel_id))
+    flags = channel_flags_cache.get(channel_id)
+    if member is not None and flags is not None:
+        return member, flags
+    stmt = (
+        select(
+            Channel.is_public,
+            Channel.is_personal,
+            Channel.is_active,
+            ChannelMember.permissions,
+            ChannelMember.is_owner,
+        )
+        .outerjoin(
+            ChannelMember, and_(ChannelMember.channel_id == Channel.id, ChannelMember.user_id == user_id)
+        )
+        .where(Channel.id == channel_id)
+    )
+    if async_replica_engine is not None and db_session.bind is async_replica_engine:
+        async with make_async_session() as primary_session:
+            row = (await primary_session.execute(stmt)).one_or_none()
+    else:
+        row = (await db_session.execute(stmt)).one_or_none()
+    if row is None:
+        return None
+    member = MemberAccess(row.permissions, bool(row.is_owner))
+    flags = ChannelFlags(row.is_public, row.is_personal, row.is_active)
+    expires_at = time.time() + settings.auth.channel_access_cache_ttl_in_sec
+    member_access_cache.set((user_id, channel_id), member, expires_at=expires_at)
+    channel_flags_cache.set(channel_id, flags, expires_at=expires_at)
+    return member, flags
+
+
+def _invalidate_pending(session: Session) -> None:
+    pending: List[Tuple[ExpiringLRUCache, object]] = session.info[_PENDING_INVALIDATIONS]
+    for cache, key in pending:
+        cache.pop(key)
+    pending.clear()
+
+
+def _invalidate(db_session: AsyncSession, cache: ExpiringLRUCache, key: object) -> None:
+    cache.pop(key)
+    pending = db_session.info.get(_PENDING_INVALIDATIONS)
+    if pending is None:
+        pending = db_session.info[_PENDING_INVALIDATIONS] = []
+        event.listen(db_session.sync_session, "after_commit", _invalidate_pending)
+    pending.append((cache, key))
+
+
+def invalidate_channel_member(db_session: AsyncSession, channel_id: int, user_id: int) -> None:
+    """Сбрасывает права пользователя в канале (вступление, выход, смена роли или владельца)."""
+    _invalidate(db_session, member_access_cache, (user_id, channel_id))
+
+
+def invalidate_channel(db_session: AsyncSession, channel_id: int) -> None:
+    """Сбрасывает признаки канала (публичность, удаление и восстановление)."""
+    _invalidate(db_session, channel_flags_cache, channel_id)
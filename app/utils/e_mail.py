@@ -3,27 +3,69 @@ import ssl
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
-from app import settings
-
+from sqlalchemy.ext.asyncio import AsyncSession
 
-def send_ascii_email(receiver: str, message: str):
-    context = ssl.create_default_context()
-    with smtplib.SMTP_SSL(settings.email.smtp_host, settings.email.ssl_port, context=context) as server:
-        server.login(settings.email.sender, settings.email.password)
-        server.sendmail(settings.email.sender, receiver, message)
+from app import settings
+from app.models import EmailOutbox
 
 
-def send_email(receiver: str, subject: str, msg: str):
+def build_email(receiver: str, subject: str, msg: str) -> str:
     message = MIMEMultipart("alternative")
     message["Subject"] = subject
     message["From"] = settings.email.sender
     message["To"] = receiver
     message.attach(MIMEText(msg, "plain", "utf-8"))
-    send_ascii_email(receiver, message.as_string())
+    return message.as_string()
+
+
+class SMTPMailer:
+    """Переиспользует одно авторизованное соединение с SMTP сервером для отправки нескольких писем."""
+
+    def __init__(self):
+        self._server: smtplib.SMTP | None = None
+
+    def _connect(self) -> smtplib.SMTP:
+        if settings.email.use_ssl:
+            server = smtplib.SMTP_SSL(
+                settings.email.smtp_host, settings.email.ssl_port, context=ssl.create_default_context()
+            )
+        else:
+            server = smtplib.SMTP(settings.email.smtp_host, settings.email.smtp_port)
+        server.ehlo()
+        if server.has_extn("auth"):
+            server.login(settings.email.sender, settings.email.password)
+        return server
+
+    def send(self, receiver: str, subject: str, msg: str) -> None:
+        message = build_email(receiver, subject, msg)
+        if self._server is None:
+            self._server = self._connect()
+        try:
+            self._server.sendmail(settings.email.sender, receiver, message)
+        except smtplib.SMTPServerDisconnected:
+            # Сервер закрыл простаивающее соединение, переподключаемся один раз
+            self._server = self._connect()
+            self._server.sendmail(settings.email.sender, receiver, message)
+
+    def close(self) -> None:
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except smtplib.SMTPException:
+                pass
+            self._server = None
+
+
+def enqueue_email(db_session: AsyncSession, receiver: str, subject: str, msg: str) -> EmailOutbox:
+    """Добавляет письмо в очередь отправки в текущей транзакции, не фиксируя ее."""
+    email = EmailOutbox(receiver=receiver, subject=subject, body=msg)
+    db_session.add(email)
+    return email
 
 
-def send_confirm_email(receiver: str, confirm_url: str):
-    send_email(
+def enqueue_confirm_email(db_session: AsyncSession, receiver: str, confirm_url: str) -> EmailOutbox:
+    return enqueue_email(
+        db_session,
         receiver,
         "Подтверждение почты",
         f"Вы получили это сообщение, потому что ваша почто указана при регистрации на сайте ITMO-meetings."
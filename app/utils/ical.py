@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Callable
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import settings
+
+ICS_MEDIA_TYPE = "text/calendar"
+# События копятся в буфере, чтобы не отправлять в сокет каждое событие отдельным сообщением
+CHUNK_SIZE = 64 * 1024
+# RFC 5545: строки длиннее 75 октетов переносятся
+MAX_LINE_OCTETS = 75
+
+ICS_RESPONSES = {200: {"content": {ICS_MEDIA_TYPE: {}}}, 304: {"description": "Календарь не изменился"}}
+
+
+def _escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    encoded = line.encode()
+    if len(encoded) <= MAX_LINE_OCTETS:
+        return line + "\r\n"
+    parts = []
+    start = 0
+    limit = MAX_LINE_OCTETS
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Не разрываем многобайтовый символ UTF-8
+        while end < len(encoded) and encoded[end] & 0b11000000 == 0b10000000:
+            end -= 1
+        parts.append(encoded[start:end].decode())
+        start = end
+        limit = MAX_LINE_OCTETS - 1  # строка продолжения начинается с пробела
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _format_datetime(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def meeting_to_vevent(meeting: Any, dtstamp: datetime) -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:meeting-{meeting.id}@{settings.server.host}",
+        f"DTSTAMP:{_format_datetime(dtstamp)}",
+        f"DTSTART:{_format_datetime(meeting.start_datetime)}",
+    ]
+    if meeting.duration_in_minutes:
+        end = meeting.start_datetime + timedelta(minutes=meeting.duration_in_minutes)
+        lines.append(f"DTEND:{_format_datetime(end)}")
+    lines.append(f"SUMMARY:{_escape(meeting.title)}")
+    if meeting.description:
+        lines.append(f"DESCRIPTION:{_escape(meeting.description)}")
+    lines.append(f"LOCATION:{_escape(meeting.address)}")
+    lines.append("END:VEVENT")
+    return "".join(map(_fold, lines))
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def stream_ics(
+    session_maker: async_sessionmaker[AsyncSession],
+    rows: Callable[[AsyncSession], AsyncIterator[Any]],
+    headers: dict[str, str],
+) -> StreamingResponse:
+    """Отдает календарь iCalendar, события формируются по мере чтения мероприятий из БД.
+
+    Сессия из зависимостей закрывается до начала отправки ответа,
+    поэтому мероприятия читаются в собственной сессии из session_maker.
+    """
+
+    async def content() -> AsyncIterator[str]:
+        dtstamp = datetime.now(timezone.utc)
+        chunk = ["BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//ITMO Meetings//RU\r\nCALSCALE:GREGORIAN\r\n"]
+        chunk_size = len(chunk[0])
+        async with session_maker() as db_session:
+            async for meeting in rows(db_session):
+                event = meeting_to_vevent(meeting, dtstamp)
+                chunk.append(event)
+                chunk_size += len(event)
+                if chunk_size >= CHUNK_SIZE:
+                    yield "".join(chunk)
+                    chunk.clear()
+                    chunk_size = 0
+        chunk.append("END:VCALENDAR\r\n")
+        yield "".join(chunk)
+
+    return StreamingResponse(content(), media_type=ICS_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,44 @@
+from typing import Any, AsyncIterator, Callable
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Строки копятся в буфере, чтобы не отправлять в сокет каждую запись отдельным сообщением
+CHUNK_SIZE = 64 * 1024
+
+NDJSON_RESPONSES = {200: {"content": {NDJSON_MEDIA_TYPE: {}}}}
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def stream_ndjson(
+    session_maker: async_sessionmaker[AsyncSession],
+    rows: Callable[[AsyncSession], AsyncIterator[Any]],
+    serialize: Callable[[Any], str],
+) -> StreamingResponse:
+    """Отдает записи в формате NDJSON (по одному JSON объекту на строку) по мере чтения из БД.
+
+    Сессия из зависимостей закрывается до начала отправки ответа,
+    поэтому записи читаются в собственной сессии из session_maker.
+    """
+
+    async def content() -> AsyncIterator[str]:
+        async with session_maker() as db_session:
+            chunk = []
+            chunk_size = 0
+            async for row in rows(db_session):
+                line = serialize(row) + "\n"
+                chunk.append(line)
+                chunk_size += len(line)
+                if chunk_size >= CHUNK_SIZE:
+                    yield "".join(chunk)
+                    chunk.clear()
+                    chunk_size = 0
+            if chunk:
+                yield "".join(chunk)
+
+    return StreamingResponse(content(), media_type=NDJSON_MEDIA_TYPE)
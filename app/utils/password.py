@@ -0,0 +1,82 @@
+import asyncio
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from statistics import quantiles
+from typing import Any, Callable
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app import settings
+
+
+class PasswordHasher:
+    """Хеширование паролей в пуле процессов, чтобы PBKDF2 не блокировал event loop."""
+
+    def __init__(self, method: str, salt_length: int, max_workers: int | None = None):
+        self.method = method
+        self.salt_length = salt_length
+        self.max_workers = max_workers or multiprocessing.cpu_count()
+        self._executor: ProcessPoolExecutor | None = None
+        self._in_flight = 0
+        self._completed = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+        self._recent_latencies: deque[float] = deque(maxlen=1000)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: дочерние процессы не наследуют event loop и соединения с бд
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        started_at = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            latency = time.perf_counter() - started_at
+            self._in_flight -= 1
+            self._completed += 1
+            self._total_latency += latency
+            self._max_latency = max(self._max_latency, latency)
+            self._recent_latencies.append(latency)
+
+    async def hash_password(self, plain_password: str) -> str:
+        func = partial(generate_password_hash, method=self.method, salt_length=self.salt_length)
+        return await self._run(func, plain_password)
+
+    async def verify_password(self, password_hash: str, plain_password: str) -> bool:
+        return await self._run(check_password_hash, password_hash, plain_password)
+
+    def get_metrics(self) -> dict:
+        recent = list(self._recent_latencies)
+        return {
+            "max_workers": self.max_workers,
+            "in_flight": self._in_flight,
+            "queue_depth": max(0, self._in_flight - self.max_workers),
+            "completed": self._completed,
+            "avg_latency_in_ms": self._total_latency / self._completed * 1000 if self._completed else None,
+            "max_latency_in_ms": self._max_latency * 1000,
+            "p95_latency_in_ms": (
+                quantiles(recent, n=20, method="inclusive")[-1] * 1000 if len(recent) > 1 else None
+            ),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    method=settings.password_hash.method,
+    salt_length=settings.password_hash.salt_length,
+    max_workers=settings.password_hash.max_workers,
+)
@@ -0,0 +1,68 @@
+import abc
+import time
+from typing import Tuple
+
+from app import settings
+from app.utils.cache import ExpiringLRUCache
+
+
+class RateLimitBackend(abc.ABC):
+    """Хранилище корзин (token bucket). Общее хранилище позволяет воркерам разделять лимиты."""
+
+    @abc.abstractmethod
+    async def consume(self, key: str, capacity: int, refill_per_sec: float) -> float:
+        """Забирает один токен из корзины key.
+
+        Возвращает 0, если токен получен, иначе - через сколько секунд появится следующий токен.
+        """
+
+
+class LocalRateLimitBackend(RateLimitBackend):
+    """Корзины в памяти текущего процесса. Полностью заполненные корзины вытесняются из кеша."""
+
+    def __init__(self, maxsize: int):
+        self._buckets: ExpiringLRUCache[str, Tuple[float, float]] = ExpiringLRUCache(maxsize)
+
+    async def consume(self, key: str, capacity: int, refill_per_sec: float) -> float:
+        now = time.time()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = float(capacity)
+        else:
+            tokens, updated_at = bucket
+            tokens = min(float(capacity), tokens + (now - updated_at) * refill_per_sec)
+        if tokens < 1:
+            return (1 - tokens) / refill_per_sec
+        tokens -= 1
+        self._buckets.set(key, (tokens, now), expires_at=now + (capacity - tokens) / refill_per_sec)
+        return 0
+
+
+class LoginThrottle:
+    """Ограничивает количество попыток входа по логину и по ip клиента."""
+
+    def __init__(
+        self, backend: RateLimitBackend, attempts_per_min_by_login: int, attempts_per_min_by_ip: int
+    ):
+        self.backend = backend
+        self.attempts_per_min_by_login = attempts_per_min_by_login
+        self.attempts_per_min_by_ip = attempts_per_min_by_ip
+
+    async def get_retry_after(self, login: str, client_ip: str | None) -> float:
+        """Возвращает 0, если попытку входа можно выполнить, иначе - через сколько секунд ее повторить."""
+        if client_ip is not None:
+            retry_after = await self.backend.consume(
+                f"login-ip:{client_ip}", self.attempts_per_min_by_ip, self.attempts_per_min_by_ip / 60
+            )
+            if retry_after:
+                return retry_after
+        return await self.backend.consume(
+            f"login:{login}", self.attempts_per_min_by_login, self.attempts_per_min_by_login / 60
+        )
+
+
+login_throttle = LoginThrottle(
+    LocalRateLimitBackend(settings.auth.login_throttle_cache_size),
+    attempts_per_min_by_login=settings.auth.login_attempts_per_min_by_login,
+    attempts_per_min_by_ip=settings.auth.login_attempts_per_min_by_ip,
+)
@@ -9,3 +9,12 @@ def get_email_confirm_url(user_id: int, user_email: str) -> str:
         user_id,
         create_simple_hash(str(user_id) + user_email),
     )
+
+
+def get_calendar_url(user_id: int) -> str:
+    return "http://%s:%s/user/%s/meetings.ics?t=%s" % (
+        settings.server.host,
+        settings.server.port,
+        user_id,
+        create_simple_hash("calendar" + str(user_id)),
+    )
@@ -1,9 +1,24 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api import api_router
+from app.database.deps import read_your_writes_middleware
+from app.database.query_stats import query_stats_middleware
+from app.database.slow_queries import slow_query_log, slow_query_middleware
+from app.utils.password import password_hasher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    slow_query_log.start()
+    yield
+    await slow_query_log.stop()
+    password_hasher.shutdown()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -11,4 +26,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.middleware("http")(read_your_writes_middleware)
+app.middleware("http")(query_stats_middleware)
+if slow_query_log.enabled:
+    app.middleware("http")(slow_query_middleware)
 app.include_router(api_router)
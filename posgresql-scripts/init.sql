@@ -21,7 +21,10 @@ create table person (
     is_staff bool not null
         default false,
     is_active bool not null
-        default true
+        default true,
+    -- ETag календаря мероприятий пользователя
+    meetings_version int not null
+        default 0
 );
 
 create index person_pk on person (user_id);
@@ -40,12 +43,19 @@ create table channel (
     rating float
         check ( rating >= 0 AND rating <= 5)
         default null,
+    rating_sum int not null
+        default 0,
+    rating_count int not null
+        default 0,
     is_personal bool not null
         default false,
     is_public bool not null
         default true,
     is_active bool not null
-        default true
+        default true,
+    -- Есть мероприятия, не разосланные в meeting_feed: лента читает их из meeting
+    has_unfanned_meetings bool not null
+        default false
 );
 
 create index channel_pk on channel (channel_id);
@@ -71,6 +81,7 @@ create table channel_member (
 );
 
 create index channel_member_pk on channel_member (channel_id, user_id);
+create index channel_member_user_id on channel_member (user_id, channel_id);
 create index channel_member_permissions on channel_member (permissions);
 
 -- Триггеры и функции для подсчета подписчиков
@@ -126,21 +137,31 @@ create table meeting (
     only_for_russians bool not null
         default false,
     rating float,
+    rating_sum int not null
+        default 0,
+    rating_count int not null
+        default 0,
     is_public bool not null
-        default true
+        default true,
+    members_cnt int not null
+        check ( members_cnt >= 0 )
+        default 0,
+    is_fanned_out bool not null
+        default false,
+    search_vector tsvector generated always as (
+        setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) stored
 );
 
 create index meeting_pk on meeting (meeting_id);
-create index meeting_channel_id on meeting (channel_id);
-create index meeting_title on meeting (title);
-create index meeting_start_time on meeting (start_datetime);
-create index meeting_address on meeting (address);
-create index meeting_capacity on meeting (capacity);
-create index meeting_price on meeting (price);
-create index meeting_minimum_age on meeting (minimum_age);
-create index meeting_maximum_age on meeting (maximum_age);
-create index meeting_for_itmo_students on meeting (only_for_itmo_students);
-create index meeting_for_russians on meeting (only_for_russians);
+-- Поиск: полнотекстовый по search_vector, фильтры по дате начала, каналу и бесплатные мероприятия
+create index meeting_search_vector on meeting using gin (search_vector);
+create index meeting_start_datetime on meeting (start_datetime, meeting_id);
+create index meeting_channel_id_start_datetime on meeting (channel_id, start_datetime);
+create index meeting_free_start_datetime on meeting (start_datetime, meeting_id) where price = 0;
 
 
 create table feedback (
@@ -157,45 +178,12 @@ create table feedback (
 );
 
 create index feedback_pk on feedback (user_id, meeting_id);
+create index feedback_meeting_id on feedback (meeting_id);
 
--- Процедура и триггеры для вычисление рейтинга события (meeting.py) на основе отзывов
-create function calc_meeting_rating_trigger_func() returns trigger as $$
-    begin
-        if (TG_OP = 'DELETE') then
-            update meeting
-                set rating = (select avg(rate) from feedback where meeting_id = old.meeting_id)
-                where meeting_id = old.meeting_id;
-        else
-            update meeting
-                set rating = (select avg(rate) from feedback where meeting_id = new.meeting_id)
-                where meeting_id = new.meeting_id;
-        end if;
-        return null;
-    end;
-    $$ language plpgsql;
-
-create trigger feedback_insert after insert or update or delete on feedback
-    for each row execute procedure calc_meeting_rating_trigger_func();
-
-
--- Процедура и триггеры для вычисление рейтинга канала (channel) на основе отзывов
-create function calc_channel_rating_func() returns trigger as $$
-    begin
-        if (TG_OP = 'DELETE') then
-            update channel
-                set rating = (select avg(rating) from meeting where channel_id = new.channel_id)
-                where channel_id = new.channel_id;
-        else
-            update channel
-                set rating = (select avg(rating) from meeting where channel_id = new.channel_id)
-                where channel_id = new.channel_id;
-        end if;
-        return null;
-    end;
-    $$ language plpgsql;
-
-create trigger meeting_insert after insert or update or delete on meeting
-    for each row execute procedure calc_channel_rating_func();
+-- Суммы и количества оценок мероприятий (meeting) и каналов (channel) изменяются на разницу
+-- событиями маппера отзывов (app/models/triggers.py), как и в схеме миграций alembic.
+-- Триггеры в БД здесь не создаются, иначе каждое изменение отзыва учитывалось бы дважды
+-- (сверка сумм: python -m app.jobs.ratings)
 
 
 create table category (
@@ -233,6 +221,7 @@ create table meeting_category (
 );
 
 create index meeting_category_pk_idx on meeting_category (meeting_id, category_id);
+create index meeting_category_category_id on meeting_category (category_id, meeting_id);
 
 
 create table meeting_member (
@@ -249,6 +238,56 @@ create table meeting_member (
 );
 
 create index meeting_member_pk_idx on meeting_member (meeting_id, user_id);
+create index meeting_member_user_id on meeting_member (user_id, meeting_id);
+
+
+-- Лист ожидания мероприятий без свободных мест, очередь упорядочена по waiter_id
+create table meeting_waiter (
+    waiter_id bigserial primary key,
+    meeting_id int not null references meeting(meeting_id)
+        on delete CASCADE
+        on update CASCADE,
+    user_id int not null references person(user_id)
+        on delete CASCADE
+        on update CASCADE,
+    created_at timestamp with time zone not null
+        default CURRENT_TIMESTAMP,
+    constraint
+        meeting_waiter_user unique (meeting_id, user_id)
+);
+
+create index meeting_waiter_meeting_id on meeting_waiter (meeting_id, waiter_id);
+
+
+-- Лента мероприятий: строки для каналов не больше SERVER_FEED_MAX_FAN_OUT участников
+create table meeting_feed (
+    user_id int not null references person(user_id)
+        on delete CASCADE
+        on update CASCADE,
+    start_datetime timestamp with time zone not null,
+    meeting_id int not null references meeting(meeting_id)
+        on delete CASCADE
+        on update CASCADE,
+    primary key (user_id, start_datetime, meeting_id)
+);
+
+create index meeting_feed_meeting_id on meeting_feed (meeting_id);
+
+
+-- Рекомендации мероприятий, заполняет задание app.jobs.recommendations
+create table meeting_recommendation (
+    user_id int not null references person(user_id)
+        on delete CASCADE
+        on update CASCADE,
+    position smallint not null,
+    meeting_id int not null references meeting(meeting_id)
+        on delete CASCADE
+        on update CASCADE,
+    score real not null,
+    primary key (user_id, position)
+);
+
+create index meeting_recommendation_meeting_id on meeting_recommendation (meeting_id);
 
 
 create table passport_rf (
@@ -0,0 +1,71 @@
+"""Бенчмарк проверки токена доступа до и после кеша проверенных токенов (app.api.deps).
+
+Запуск: python -m scripts.bench_access_token --tokens 1000 --requests 100000
+
+"без кеша" - проверка, которая выполнялась на каждый запрос раньше: jwt.decode и валидация
+AccessTokenPayload. "с кешем" - get_access_token, запросы распределены по --tokens токенам
+(клиенты повторяют один токен много раз за время его жизни). Отдельно измеряются промах
+(проверка + запись в кеш) и попадание в кеш. К БД скрипт не обращается.
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, List
+
+import jwt
+
+from app import settings
+from app.api.deps import access_token_cache, get_access_token
+from app.models import User
+from app.utils.security import AccessTokenPayload, create_access_token
+
+
+def decode_without_cache(token: str) -> AccessTokenPayload:
+    return AccessTokenPayload.model_validate(
+        jwt.decode(token, settings.auth.jwt_secret, algorithms=[settings.auth.jwt_algorithm])
+    )
+
+
+def measure(name: str, check: Callable[[str], AccessTokenPayload], tokens: List[str]) -> float:
+    started_at = time.perf_counter()
+    for token in tokens:
+        check(token)
+    per_call = (time.perf_counter() - started_at) / len(tokens) * 1e6
+    print(f"{name:<24} {per_call:8.2f} us/request")
+    return per_call
+
+
+def miss(token: str) -> AccessTokenPayload:
+    access_token_cache.clear()
+    return get_access_token(token)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--tokens", type=int, default=1_000, help="количество разных токенов")
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tokens = [create_access_token(User(id=user_id, is_staff=False)) for user_id in range(1, args.tokens + 1)]
+    requests = random.Random(args.seed).choices(tokens, k=args.requests)
+    print(f"{args.requests} requests, {args.tokens} tokens, cache size {access_token_cache.maxsize}")
+
+    before = measure("без кеша", decode_without_cache, requests)
+    access_token_cache.clear()
+    hits, misses = access_token_cache.hits, access_token_cache.misses
+    after = measure("с кешем", get_access_token, requests)
+    hit_ratio = (access_token_cache.hits - hits) / (
+        access_token_cache.hits - hits + access_token_cache.misses - misses
+    )
+    measure("с кешем, промах", miss, requests[: min(len(requests), 10_000)])
+    get_access_token(tokens[0])
+    measure("с кешем, попадание", get_access_token, [tokens[0]] * len(requests))
+    print(f"hit ratio {hit_ratio:.3f}, speedup {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Бенчмарк задания рекомендаций (app.jobs.recommendations).
+
+Запуск: python -m scripts.bench_recommendations --users 100000
+
+Заполняет БД из настроек (POSTGRES_DB) синтетическими пользователями, каналами, категориями
+и мероприятиями, затем выполняет задание так же, как app.jobs.recommendations.main, и печатает
+время этапов. Данные не удаляются, поэтому нужна отдельная БД с примененными миграциями:
+    createdb meetings_bench && POSTGRES_DB=meetings_bench alembic upgrade head
+С --no-seed задание выполняется на уже заполненной БД.
+"""
+
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+from sqlalchemy import text
+
+from app import settings
+from app.database.core import async_engine, make_async_session
+from app.jobs.recommendations import get_user_chunk, load_candidates, recommend_users
+from app.models.channel_member import Role
+
+SEED_STATEMENTS = [
+    "insert into category (name) select :tag || '-' || g from generate_series(1, :categories) g",
+    "insert into person (username, telephone, email, password_hash, firstname, surname, gender, "
+    "date_of_birth, confidentiality, is_staff, is_active) "
+    "select :tag || '-' || g, '+' || :tag || g, :tag || '-' || g || '@example.com', '!', 'Bench', 'User', "
+    "'male', '2000-01-01', 0, false, true from generate_series(1, :users) g",
+    "insert into channel (name, members_cnt, is_personal, is_public, is_active) "
+    "select :tag || '-' || g, 0, false, g % 4 <> 0, true from generate_series(1, :channels) g",
+    # Каждый пользователь подписан на channels_per_user случайных каналов
+    "insert into channel_member (channel_id, user_id, date_of_join, permissions, is_owner, "
+    "notify_about_meeting) "
+    "select distinct on (c.channel_id, p.user_id) c.channel_id, p.user_id, now(), :member, false, false "
+    "from person p cross join generate_series(1, :channels_per_user) k "
+    "join lateral (select channel_id from channel where name like :tag || '-%' "
+    "offset (abs(hashint4(p.user_id * 31 + k)) % :channels) limit 1) c on true "
+    "where p.username like :tag || '-%'",
+    "update channel set members_cnt = (select count(*) from channel_member m "
+    "where m.channel_id = channel.channel_id) where name like :tag || '-%'",
+    "insert into meeting (channel_id, title, start_datetime, duration_in_minutes, address, capacity, "
+    "price, minimum_age, maximum_age, only_for_itmo_students, only_for_russians, rating, "
+    "rating_sum, rating_count) "
+    "select c.channel_id, :tag || ' ' || g, now() + g * interval '10 minutes', 60, 'Kronverksky 49', "
+    "20, 0, 0, 150, false, false, case when g % 3 = 0 then 4 end, "
+    "case when g % 3 = 0 then 8 else 0 end, case when g % 3 = 0 then 2 else 0 end "
+    "from generate_series(1, :meetings) g "
+    "join lateral (select channel_id from channel where name like :tag || '-%' "
+    "offset g % :channels limit 1) c on true",
+    "insert into meeting_category (meeting_id, category_id) "
+    "select distinct m.meeting_id, c.category_id from meeting m cross join generate_series(1, 3) k "
+    "join lateral (select category_id from category where name like :tag || '-%' "
+    "offset (abs(hashint4(m.meeting_id * 7 + k)) % :categories) limit 1) c on true "
+    "where m.title like :tag || ' %'",
+    "insert into favorite_category (user_id, category_id) "
+    "select distinct p.user_id, c.category_id from person p cross join generate_series(1, :favorites) k "
+    "join lateral (select category_id from category where name like :tag || '-%' "
+    "offset (abs(hashint4(p.user_id * 13 + k)) % :categories) limit 1) c on true "
+    "where p.username like :tag || '-%'",
+    "analyze",
+]
+
+
+async def seed(args: argparse.Namespace) -> None:
+    params = {
+        "tag": f"b{uuid4().hex[:6]}",
+        "users": args.users,
+        "channels": args.channels,
+        "channels_per_user": args.channels_per_user,
+        "meetings": args.meetings,
+        "categories": args.categories,
+        "favorites": args.favorites,
+        "member": Role.MEMBER,
+    }
+    async with async_engine.connect() as connection:
+        for statement in SEED_STATEMENTS:
+            await connection.execute(text(statement), params if statement != "analyze" else {})
+        await connection.commit()
+
+
+async def run_job() -> None:
+    started_at = time.perf_counter()
+    async with make_async_session() as db_session:
+        candidates = await load_candidates(db_session)
+        loaded_at = time.perf_counter()
+        print(
+            f"load_candidates: {loaded_at - started_at:.1f} s, {len(candidates.meeting_ids)} meetings, "
+            f"{len(candidates.channel_ids)} channels, {len(candidates.category_ids)} categories"
+        )
+        users = 0
+        after_user_id = 0
+        chunk_size = settings.jobs.recommendation_chunk_size
+        while len(user_ids := await get_user_chunk(db_session, after_user_id, chunk_size)) > 0:
+            await recommend_users(db_session, candidates, after_user_id, user_ids)
+            users += len(user_ids)
+            after_user_id = int(user_ids[-1])
+    finished_at = time.perf_counter()
+    print(
+        f"recommend_users: {finished_at - loaded_at:.1f} s for {users} users "
+        f"({users / (finished_at - loaded_at):.0f} users/s, chunk {chunk_size})"
+    )
+    print(f"total: {finished_at - started_at:.1f} s")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--channels", type=int, default=2_000)
+    parser.add_argument("--channels-per-user", type=int, default=2)
+    parser.add_argument("--meetings", type=int, default=5_000)
+    parser.add_argument("--categories", type=int, default=40)
+    parser.add_argument("--favorites", type=int, default=4)
+    parser.add_argument("--no-seed", action="store_true")
+    args = parser.parse_args()
+    if not args.no_seed:
+        started_at = time.perf_counter()
+        await seed(args)
+        print(f"seed: {time.perf_counter() - started_at:.1f} s")
+    await run_job()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
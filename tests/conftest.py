@@ -0,0 +1,70 @@
+"""Общие фикстуры тестов.
+
+Тесты работают с БД из настроек (переменные окружения POSTGRES_*), схема должна быть
+создана миграциями (alembic upgrade head). Каждый тест создает собственных пользователей,
+каналы и мероприятия, поэтому тесты можно запускать на непустой БД.
+"""
+
+from datetime import date
+from itertools import count
+from typing import AsyncIterator, Awaitable, Callable
+from uuid import uuid4
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import main
+from app.database.core import async_engine, make_async_session
+from app.models import User
+from app.models.user import Gender
+
+_user_numbers = count()
+
+
+@pytest.fixture(scope="session")
+def anyio_backend() -> str:
+    # Один цикл событий на все тесты: соединения пула привязаны к циклу, в котором созданы
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def engine(anyio_backend):
+    yield async_engine
+    await async_engine.dispose()
+
+
+@pytest.fixture
+async def client(engine) -> AsyncIterator[httpx.AsyncClient]:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.fixture
+async def db_session(engine) -> AsyncIterator[AsyncSession]:
+    async with make_async_session() as session:
+        yield session
+
+
+@pytest.fixture
+def create_user(db_session: AsyncSession) -> Callable[[], Awaitable[User]]:
+    """Создает активного пользователя, пароль не задается: тестам нужен только токен доступа."""
+    prefix = uuid4().hex[:8]
+
+    async def create() -> User:
+        number = next(_user_numbers)
+        user = User(
+            username=f"t{prefix}{number}",
+            telephone=f"+7{int(prefix, 16) % 10**6:06d}{number:04d}",
+            email=f"t{prefix}{number}@example.com",
+            password_hash="!",
+            firstname="Test",
+            surname="User",
+            gender=Gender.male,
+            date_of_birth=date(2000, 1, 1),
+        )
+        db_session.add(user)
+        await db_session.commit()
+        return user
+
+    return create
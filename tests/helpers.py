@@ -0,0 +1,40 @@
+from datetime import timedelta
+from typing import Dict
+
+import httpx
+
+from app.models import User
+from app.utils.security import create_access_token
+from app.utils.time import datetime_now
+
+
+def auth_headers(user: User) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {create_access_token(user)}"}
+
+
+async def create_channel(client: httpx.AsyncClient, owner: User, **data) -> int:
+    response = await client.post("/channel/", json={"name": "Test", **data}, headers=auth_headers(owner))
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+async def subscribe(client: httpx.AsyncClient, user: User, channel_id: int) -> None:
+    response = await client.post(
+        f"/channel/{channel_id}/subscribe/", json={"notify_about_meeting": False}, headers=auth_headers(user)
+    )
+    assert response.status_code == 200, response.text
+
+
+async def create_meeting(client: httpx.AsyncClient, owner: User, channel_id: int, **data) -> int:
+    meeting = {
+        "title": "Test meeting",
+        "start_datetime": (datetime_now() + timedelta(days=2)).isoformat(),
+        "duration_in_minutes": 60,
+        "address": "Kronverksky 49",
+        "capacity": 10,
+        "channel_id": channel_id,
+        **data,
+    }
+    response = await client.post("/meeting/", json=meeting, headers=auth_headers(owner))
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
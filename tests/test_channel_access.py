@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import select, text, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import settings
+from app.database.core import _create_engine
+from app.models import ChannelMember
+from app.models.channel_member import Role
+from app.utils import channel_access
+from app.utils.channel_access import get_channel_access, invalidate_channel_member, member_access_cache
+from tests.helpers import create_channel, subscribe
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def replica_engine(monkeypatch):
+    """Реплика указывает на ту же БД, отставание моделируется снимком REPEATABLE READ."""
+    engine = _create_engine(settings.postgres.get_url(driver="asyncpg"))
+    monkeypatch.setattr(channel_access, "async_replica_engine", engine)
+    yield engine
+    await engine.dispose()
+
+
+async def test_cache_is_not_filled_from_lagging_replica(client, db_session, create_user, replica_engine):
+    owner = await create_user()
+    user = await create_user()
+    channel_id = await create_channel(client, owner, is_public=True)
+    await subscribe(client, user, channel_id)
+
+    async with async_sessionmaker(replica_engine)() as replica_session:
+        await replica_session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        await replica_session.execute(text("select 1"))
+        assert (
+            await replica_session.scalar(
+                select(ChannelMember.permissions).where(
+                    ChannelMember.channel_id == channel_id, ChannelMember.user_id == user.id
+                )
+            )
+            == Role.MEMBER
+        )
+
+        await db_session.execute(
+            update(ChannelMember)
+            .where(ChannelMember.channel_id == channel_id, ChannelMember.user_id == user.id)
+            .values(permissions=Role.BLOCKED)
+        )
+        invalidate_channel_member(db_session, channel_id, user.id)
+        await db_session.commit()
+
+        member, _ = await get_channel_access(replica_session, user.id, channel_id)
+    assert member.permissions == Role.BLOCKED
+    assert member_access_cache.get((user.id, channel_id)).permissions == Role.BLOCKED
@@ -0,0 +1,82 @@
+import asyncio
+import smtplib
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, select
+
+from app import settings
+from app.database.core import make_async_session
+from app.jobs.email_outbox import deliver_batch
+from app.models import EmailOutbox
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeMailer:
+    """Вместо отправки вызывает send_hook, SMTPMailer.send выполняется в отдельном потоке."""
+
+    def __init__(self, send_hook):
+        self.send_hook = send_hook
+
+    def send(self, receiver: str, subject: str, msg: str) -> None:
+        self.send_hook(receiver)
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+async def due_email(db_session, monkeypatch) -> EmailOutbox:
+    """Самое давнее письмо очереди: пачка из одного письма заберет именно его."""
+    monkeypatch.setattr(settings.email, "outbox_batch_size", 1)
+    oldest = await db_session.scalar(select(func.min(EmailOutbox.next_attempt_at)))
+    email = EmailOutbox(
+        receiver=f"{uuid4().hex}@example.com",
+        subject="Test",
+        body="Test",
+        next_attempt_at=min(oldest or datetime.now(timezone.utc), datetime.now(timezone.utc))
+        - timedelta(days=1),
+    )
+    db_session.add(email)
+    await db_session.commit()
+    return email
+
+
+async def get_email(email_id: int) -> EmailOutbox:
+    """Письмо из другой транзакции. NOWAIT: строка не должна быть заблокирована."""
+    async with make_async_session() as db_session:
+        stmt = select(EmailOutbox).where(EmailOutbox.id == email_id).with_for_update(nowait=True)
+        return await db_session.scalar(stmt)
+
+
+async def test_email_is_claimed_and_committed_before_sending(db_session, due_email):
+    loop = asyncio.get_running_loop()
+    seen_while_sending = []
+
+    def send_hook(receiver: str) -> None:
+        seen_while_sending.append(asyncio.run_coroutine_threadsafe(get_email(due_email.id), loop).result())
+
+    assert await deliver_batch(db_session, FakeMailer(send_hook)) == 1
+
+    [claimed] = seen_while_sending
+    assert claimed.attempts == 1
+    assert claimed.sent_at is None
+    assert claimed.next_attempt_at > datetime.now(timezone.utc)
+    sent = await get_email(due_email.id)
+    assert sent.sent_at is not None
+    assert sent.attempts == 1
+
+
+async def test_failed_email_is_scheduled_for_retry(db_session, due_email):
+    def send_hook(receiver: str) -> None:
+        raise smtplib.SMTPRecipientsRefused({receiver: (550, b"No such user")})
+
+    assert await deliver_batch(db_session, FakeMailer(send_hook)) == 1
+
+    failed = await get_email(due_email.id)
+    assert failed.sent_at is None
+    assert failed.attempts == 1
+    assert "SMTPRecipientsRefused" in failed.last_error
+    assert failed.next_attempt_at > datetime.now(timezone.utc)
@@ -0,0 +1,35 @@
+import pytest
+
+from app.models import User
+from app.schemas.user import parse_login
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize(
+    "login, expected",
+    [
+        ("Elison@Example.com", {"email": "Elison@example.com"}),
+        ("elison98", {"username": "elison98"}),
+        ("+79001234567", {"telephone": "+7 900 123-45-67"}),
+        ("+7 (900) 123-45-67", {"telephone": "+7 900 123-45-67"}),
+        # Цифры могут быть и именем пользователя, и телефоном без "+"
+        ("79001234567", {"username": "79001234567", "telephone": "+7 900 123-45-67"}),
+        ("123", {"username": "123"}),
+        ("not a login", {"username": "not a login", "telephone": "not a login", "email": "not a login"}),
+    ],
+)
+def test_parse_login(login, expected):
+    assert parse_login(login) == expected
+
+
+async def test_get_by_login_finds_digit_only_phone_and_username(db_session, create_user):
+    user = await create_user()
+    digits = f"{user.id % 10**7:07d}"
+    user.telephone = f"+7 949 {digits[:3]}-{digits[3:5]}-{digits[5:]}"
+    other = await create_user()
+    other.username = f"{other.id:020d}"[-20:]
+    await db_session.commit()
+
+    assert (await User.get_by_login(db_session, parse_login(f"7949{digits}"))).id == user.id
+    assert (await User.get_by_login(db_session, parse_login(other.username))).id == other.id
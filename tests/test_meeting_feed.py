@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import delete, select, update
+
+from app import settings
+from app.models import Channel, Meeting, MeetingFeed
+from tests.helpers import auth_headers, create_channel, create_meeting, subscribe
+
+pytestmark = pytest.mark.anyio
+
+
+async def get_feed_ids(client, user):
+    response = await client.get("/user/me/feed/", params={"limit": 50}, headers=auth_headers(user))
+    assert response.status_code == 200, response.text
+    return [meeting["id"] for meeting in response.json()["items"]]
+
+
+async def test_small_channels_are_read_from_meeting_feed_only(client, db_session, create_user):
+    owner = await create_user()
+    user = await create_user()
+    channel_ids = [await create_channel(client, owner, is_public=True) for _ in range(5)]
+    meeting_ids = []
+    for channel_id in channel_ids:
+        await subscribe(client, user, channel_id)
+        meeting_ids.append(await create_meeting(client, owner, channel_id))
+
+    assert sorted(await get_feed_ids(client, user)) == sorted(meeting_ids)
+    flags = await db_session.scalars(select(Channel.has_unfanned_meetings).where(Channel.id.in_(channel_ids)))
+    assert not any(flags)
+
+    # Каналы без отметки не просматриваются по meeting: без строк meeting_feed лента пуста,
+    # даже если мероприятия помечены неразосланными
+    await db_session.execute(delete(MeetingFeed).where(MeetingFeed.user_id == user.id))
+    await db_session.execute(update(Meeting).where(Meeting.id.in_(meeting_ids)).values(is_fanned_out=False))
+    await db_session.commit()
+    assert await get_feed_ids(client, user) == []
+
+
+async def test_large_channel_is_read_on_request(client, db_session, create_user, monkeypatch):
+    owner = await create_user()
+    user = await create_user()
+    small_channel_id = await create_channel(client, owner, is_public=True)
+    large_channel_id = await create_channel(client, owner, is_public=True)
+    for channel_id in (small_channel_id, large_channel_id):
+        await subscribe(client, user, channel_id)
+    small_meeting_id = await create_meeting(client, owner, small_channel_id)
+    monkeypatch.setattr(settings.server, "feed_max_fan_out", 1)
+    large_meeting_id = await create_meeting(client, owner, large_channel_id)
+
+    assert await db_session.scalar(
+        select(Channel.has_unfanned_meetings).where(Channel.id == large_channel_id)
+    )
+    assert sorted(await get_feed_ids(client, user)) == [small_meeting_id, large_meeting_id]
+
+    # Канал уменьшился до лимита, неразосланное мероприятие остается в ленте
+    monkeypatch.setattr(settings.server, "feed_max_fan_out", 1000)
+    assert sorted(await get_feed_ids(client, user)) == [small_meeting_id, large_meeting_id]
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models import Meeting, MeetingMember, MeetingWaiter
+from tests.helpers import auth_headers, create_channel, create_meeting
+
+pytestmark = pytest.mark.anyio
+
+
+async def get_seats(db_session, meeting_id: int):
+    """(members_cnt, количество участников, количество ожидающих) мероприятия."""
+    return (
+        await db_session.execute(
+            select(
+                Meeting.members_cnt,
+                select(func.count()).where(MeetingMember.meeting_id == meeting_id).scalar_subquery(),
+                select(func.count()).where(MeetingWaiter.meeting_id == meeting_id).scalar_subquery(),
+            ).where(Meeting.id == meeting_id)
+        )
+    ).one()
+
+
+async def test_concurrent_joins_do_not_overbook(client, db_session, create_user):
+    owner = await create_user()
+    users = [await create_user() for _ in range(30)]
+    channel_id = await create_channel(client, owner, is_public=True)
+    meeting_id = await create_meeting(client, owner, channel_id, capacity=10)
+
+    responses = await asyncio.gather(
+        *(client.post(f"/meeting/{meeting_id}/member/", headers=auth_headers(user)) for user in users)
+    )
+    status_codes = [response.status_code for response in responses]
+    assert status_codes.count(200) == 10
+    assert status_codes.count(202) == 20
+    assert await get_seats(db_session, meeting_id) == (10, 10, 20)
+
+
+async def test_freed_seats_go_to_waiters(client, db_session, create_user):
+    owner = await create_user()
+    members = [await create_user() for _ in range(4)]
+    waiters = [await create_user() for _ in range(4)]
+    newcomers = [await create_user() for _ in range(8)]
+    channel_id = await create_channel(client, owner, is_public=True)
+    meeting_id = await create_meeting(client, owner, channel_id, capacity=4)
+    url = f"/meeting/{meeting_id}/member/"
+    for member in members:
+        assert (await client.post(url, headers=auth_headers(member))).status_code == 200
+    for waiter in waiters:
+        assert (await client.post(url, headers=auth_headers(waiter))).status_code == 202
+
+    # Освобождение мест и новые вступления идут одновременно, ни одно место не должно
+    # остаться свободным, пока в очереди есть ожидающие
+    responses = await asyncio.gather(
+        *(client.delete(f"{url}me/", headers=auth_headers(member)) for member in members),
+        *(client.post(url, headers=auth_headers(newcomer)) for newcomer in newcomers),
+    )
+    assert all(response.status_code in (200, 202) for response in responses)
+
+    members_cnt, members_count, waiters_count = await get_seats(db_session, meeting_id)
+    assert members_cnt == members_count == 4
+    assert waiters_count == len(waiters) + len(newcomers) - 4
+
+
+async def test_seat_freed_after_failed_join_is_not_lost(client, db_session, create_user, monkeypatch):
+    owner = await create_user()
+    members = [await create_user() for _ in range(4)]
+    newcomer = await create_user()
+    channel_id = await create_channel(client, owner, is_public=True)
+    meeting_id = await create_meeting(client, owner, channel_id, capacity=4)
+    url = f"/meeting/{meeting_id}/member/"
+    for member in members:
+        assert (await client.post(url, headers=auth_headers(member))).status_code == 200
+
+    # Место освобождается между неудачной попыткой занять место и добавлением в очередь
+    join_failed = asyncio.Event()
+    seat_freed = asyncio.Event()
+    join = MeetingMember.join.__func__
+
+    async def join_then_wait(cls, async_session, meeting_id, user_id):
+        joined = await join(cls, async_session, meeting_id, user_id)
+        join_failed.set()
+        await seat_freed.wait()
+        return joined
+
+    monkeypatch.setattr(MeetingMember, "join", classmethod(join_then_wait))
+    joining = asyncio.create_task(client.post(url, headers=auth_headers(newcomer)))
+    await join_failed.wait()
+    assert (await client.delete(f"{url}me/", headers=auth_headers(members[0]))).status_code == 200
+    seat_freed.set()
+
+    assert (await joining).status_code == 200
+    assert await get_seats(db_session, meeting_id) == (4, 4, 0)
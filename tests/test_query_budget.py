@@ -0,0 +1,37 @@
+import pytest
+
+from app import settings
+from app.database.query_stats import assert_query_budget, query_budget
+from tests.helpers import auth_headers, create_channel, create_meeting, subscribe
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_channels_with_meetings(client, create_user, user):
+    """Пользователь подписан на два канала, в каждом по три мероприятия."""
+    owner = await create_user()
+    for _ in range(2):
+        channel_id = await create_channel(client, owner, is_public=True)
+        await subscribe(client, user, channel_id)
+        for _ in range(3):
+            await create_meeting(client, owner, channel_id)
+
+
+async def test_feed_query_budget(client, create_user):
+    user = await create_user()
+    await create_channels_with_meetings(client, create_user, user)
+
+    with query_budget(max_queries=1):
+        response = await client.get("/user/me/feed/", params={"limit": 5}, headers=auth_headers(user))
+    assert response.status_code == 200, response.text
+    assert len(response.json()["items"]) == 5
+
+
+async def test_meeting_list_query_budget(client, create_user, monkeypatch):
+    monkeypatch.setattr(settings.server, "debug", True)
+    user = await create_user()
+    await create_channels_with_meetings(client, create_user, user)
+
+    response = await client.get("/meeting/list/", params={"limit": 20}, headers=auth_headers(user))
+    assert response.status_code == 200, response.text
+    assert_query_budget(response, max_queries=1)
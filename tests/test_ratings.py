@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app.models import Channel, Meeting
+from app.utils.time import datetime_now
+from tests.helpers import auth_headers, create_channel, create_meeting
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_feedback_changes_meeting_and_channel_totals_once(client, db_session, create_user):
+    owner = await create_user()
+    members = [await create_user() for _ in range(3)]
+    channel_id = await create_channel(client, owner, is_public=True)
+    meeting_ids = [await create_meeting(client, owner, channel_id) for _ in range(2)]
+    for meeting_id in meeting_ids:
+        for member in members:
+            response = await client.post(f"/meeting/{meeting_id}/member/", headers=auth_headers(member))
+            assert response.status_code == 200, response.text
+    # Отзыв можно оставить только на прошедшее мероприятие
+    await db_session.execute(
+        update(Meeting)
+        .where(Meeting.channel_id == channel_id)
+        .values(start_datetime=datetime_now() - timedelta(days=1))
+    )
+    await db_session.commit()
+
+    first, second = meeting_ids
+    for member, rate in zip(members, (5, 2, 4)):
+        response = await client.post(
+            f"/meeting/{first}/feedback/", json={"rate": rate}, headers=auth_headers(member)
+        )
+        assert response.status_code == 200, response.text
+    response = await client.post(
+        f"/meeting/{second}/feedback/", json={"rate": 1}, headers=auth_headers(members[0])
+    )
+    assert response.status_code == 200, response.text
+    response = await client.put(
+        f"/meeting/{first}/feedback/", json={"rate": 3}, headers=auth_headers(members[1])
+    )
+    assert response.status_code == 200, response.text
+    response = await client.delete(f"/meeting/{first}/feedback/", headers=auth_headers(members[2]))
+    assert response.status_code == 200, response.text
+
+    totals = (
+        await db_session.execute(
+            select(Meeting.id, Meeting.rating_sum, Meeting.rating_count, Meeting.rating)
+            .where(Meeting.channel_id == channel_id)
+            .order_by(Meeting.id)
+        )
+    ).all()
+    assert [tuple(row) for row in totals] == [(first, 8, 2, 4.0), (second, 1, 1, 1.0)]
+    channel = (
+        await db_session.execute(
+            select(Channel.rating_sum, Channel.rating_count, Channel.rating).where(Channel.id == channel_id)
+        )
+    ).one()
+    assert tuple(channel) == (9, 3, 3.0)
@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import text
+
+from app.jobs import refresh_tokens
+from app.jobs.refresh_tokens import create_partitions
+from app.models import RefreshToken
+
+pytestmark = pytest.mark.anyio
+
+# Месяцы, для которых секций заведомо нет
+NOW = datetime(2090, 1, 15, tzinfo=timezone.utc)
+PARTITIONS = ["refresh_token_p209001", "refresh_token_p209002"]
+
+
+@pytest.fixture
+async def far_future(db_session, monkeypatch):
+    monkeypatch.setattr(refresh_tokens, "utc_now", lambda: NOW)
+    yield
+    for name in PARTITIONS:
+        await db_session.execute(text(f"drop table if exists {name}"))
+    await db_session.execute(
+        text("delete from refresh_token_default where expires_at >= :now"), {"now": NOW.replace(day=1)}
+    )
+    await db_session.commit()
+
+
+async def test_partition_takes_rows_from_default_partition(db_session, create_user, far_future):
+    user = await create_user()
+    token = RefreshToken(
+        id=str(uuid4()),
+        user_id=user.id,
+        is_staff=False,
+        expires_at=datetime(2090, 2, 10, tzinfo=timezone.utc),
+    )
+    db_session.add(token)
+    await db_session.commit()
+    partition_of_token = text("select tableoid::regclass::text from refresh_token where id = :id")
+    assert await db_session.scalar(partition_of_token, {"id": token.id}) == "refresh_token_default"
+
+    assert await create_partitions(db_session, months_ahead=1) == PARTITIONS
+
+    assert await db_session.scalar(partition_of_token, {"id": token.id}) == "refresh_token_p209002"
+    # Секция по умолчанию снова присоединена
+    default_bound = text(
+        "select pg_get_expr(relpartbound, oid) from pg_class where relname = 'refresh_token_default'"
+    )
+    assert await db_session.scalar(default_bound) == "DEFAULT"
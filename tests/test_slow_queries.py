@@ -0,0 +1,27 @@
+import logging
+import threading
+
+import pytest
+
+from app.database.slow_queries import SlowQueryLog
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_slow_query_is_logged_outside_event_loop(caplog):
+    slow_query_log = SlowQueryLog(threshold_in_ms=0, explain_per_min=0, queue_size=1)
+    entry = {
+        "engine": None,
+        "statement": "UPDATE person SET firstname = $1",
+        "parameters": ("secret",),
+        "executemany": False,
+        "duration": 0.5,
+        "route": "PUT /user/me/",
+    }
+    with caplog.at_level(logging.WARNING, logger="app.database.slow_queries"):
+        await slow_query_log._process(entry)
+
+    [record] = caplog.records
+    assert record.thread != threading.get_ident()
+    assert '"parameters": ["<str:6>"]' in record.getMessage()
+    assert "secret" not in record.getMessage()
@@ -0,0 +1,42 @@
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import exists, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Channel
+from tests.helpers import auth_headers
+
+pytestmark = pytest.mark.anyio
+
+
+async def channel_exists(db_session: AsyncSession, name: str) -> bool:
+    return await db_session.scalar(select(exists().where(Channel.name == name)))
+
+
+async def test_request_is_committed_before_response(client, db_session, create_user):
+    user = await create_user()
+    name = uuid4().hex
+    response = await client.post("/channel/", json={"name": name}, headers=auth_headers(user))
+    assert response.status_code == 200, response.text
+    assert await channel_exists(db_session, name)
+
+
+async def test_commit_error_is_returned_as_422(client, db_session, create_user, monkeypatch):
+    """get_db фиксирует транзакцию после обработчика: ошибка фиксации должна попасть в ответ,
+    а не произойти после его отправки.
+    """
+    user = await create_user()
+
+    async def commit(self):
+        raise IntegrityError("COMMIT", {}, Exception("deferred constraint violated"))
+
+    monkeypatch.setattr(AsyncSession, "commit", commit)
+    name = uuid4().hex
+    response = await client.post("/channel/", json={"name": name}, headers=auth_headers(user))
+    monkeypatch.undo()
+
+    assert response.status_code == 422
+    assert "deferred constraint violated" in response.json()["detail"]
+    assert not await channel_exists(db_session, name)